@@ -0,0 +1,102 @@
+import sys
+import json
+import socketserver
+
+from searchmain import load_map, run_search, get_direction, path_cost
+
+# Long-lived query mode: the map is parsed and its Grid built once, then every (start, goal, method) query is answered on that grid.
+# Queries and answers are JSON lines, e.g.
+#   {"id": 1, "start": [0, 1], "goal": [7, 0], "method": "AS"}
+#   {"id": 1, "method": "AS", "goal": [7, 0], "path_length": 10, "path_cost": 10, "total_nodes": 13, "directions": ["right", ...]}
+# "goal" may be one [x, y] pair or a list of them and defaults to the map's goal(s); "method" defaults to AS; "id" is echoed back.
+
+def answer(grid, goal, query, search_heuristic=None, cache=None): # Run one query against the loaded grid, returning the JSON-ready reply
+    reply = {"id": query.get("id")} if "id" in query else {}
+    try:
+        method = query.get("method", "AS")
+        start = tuple(query["start"])
+        target = query.get("goal", goal)
+        target = [tuple(position) for position in target] if isinstance(target[0], list) else tuple(target)
+        if cache is None:
+            path, total_nodes, _ = run_search(grid, start, target, method, search_heuristic)
+        else: # Repeated queries are answered from the cache without searching
+            path, total_nodes, _ = cache.search(grid, start, target, method, search_heuristic)
+    except KeyError as error:
+        reply["error"] = f"Missing field: {error}"
+        return reply
+    except (TypeError, IndexError, ValueError) as error: # Malformed coordinates or invalid search method
+        reply["error"] = str(error)
+        return reply
+    reply["method"] = method
+    reply["goal"] = [path[-1].x, path[-1].y] if path else None # Goal actually reached, None when no goal is reachable
+    reply["path_length"] = len(path) - 1 if path else None
+    reply["path_cost"] = path_cost(grid, path) if path else None # Differs from path_length only on maps with terrain costs
+    reply["total_nodes"] = total_nodes
+    reply["directions"] = [get_direction(path[i], path[i+1]) for i in range(len(path)-1)] if path else []
+    return reply
+
+def serve_stream(grid, goal, infile, outfile, search_heuristic=None, cache=None): # Answer one query per input line until end of input
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            query = json.loads(line)
+        except ValueError as error:
+            reply = {"error": f"Invalid JSON: {error}"}
+        else:
+            reply = answer(grid, goal, query, search_heuristic, cache) if isinstance(query, dict) else {"error": "Query must be a JSON object"}
+        outfile.write(json.dumps(reply) + "\n")
+        outfile.flush() # Reply before reading the next query so clients can pipeline one at a time
+
+def serve_socket(grid, goal, port, host="127.0.0.1", search_heuristic=None, cache=None): # Same protocol over local TCP connections, one thread per client
+    class QueryHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = (line.decode() for line in self.rfile)
+            writer = _SocketWriter(self.wfile)
+            serve_stream(grid, goal, reader, writer, search_heuristic, cache)
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), QueryHandler) as server:
+        server.daemon_threads = True
+        server.serve_forever()
+
+class _SocketWriter: # Text adapter over the handler's binary output stream
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode())
+
+    def flush(self):
+        self.wfile.flush()
+
+# Usage: python batch.py <map file> [--port PORT] [--alt K] [--hpa N] [--cache N] [--cache-file FILE]
+# Without --port, queries are read from stdin and answers written to stdout. --alt K builds (or loads) the K-landmark ALT tables once
+# and uses them as the heuristic of every informed query. --hpa N loads (or builds and saves) the cluster graph of "HPA" queries up
+# front; otherwise the first "HPA" query builds it. --cache N keeps the results of the N most recent distinct queries in memory (see
+# cache.py) and --cache-file FILE also keeps them in a SQLite file, for later runs on the same map.
+if __name__ == "__main__":
+    filename = sys.argv[1]
+    try:
+        grid, _, goal = load_map(filename)
+    except ValueError as error: # No goal in the map file
+        print(error)
+        sys.exit(1)
+    grid.components() # Label the connected components up front: queries with no reachable goal are then answered without searching
+    search_heuristic = None # Default heuristic for the map's neighbourhood
+    if "--alt" in sys.argv:
+        from landmarks import load_or_build_landmarks
+        search_heuristic = load_or_build_landmarks(grid, filename, int(sys.argv[sys.argv.index("--alt") + 1]))
+    if "--hpa" in sys.argv: # Build (or load) the HPA* cluster graph once, with clusters of N x N cells, for "HPA" queries
+        from hpa import load_or_build_abstraction
+        load_or_build_abstraction(grid, filename, int(sys.argv[sys.argv.index("--hpa") + 1]))
+    cache = None
+    if "--cache" in sys.argv or "--cache-file" in sys.argv:
+        from cache import ResultCache, DEFAULT_CAPACITY
+        capacity = int(sys.argv[sys.argv.index("--cache") + 1]) if "--cache" in sys.argv else DEFAULT_CAPACITY
+        cache = ResultCache(capacity, sys.argv[sys.argv.index("--cache-file") + 1] if "--cache-file" in sys.argv else None)
+    if "--port" in sys.argv:
+        serve_socket(grid, goal, int(sys.argv[sys.argv.index("--port") + 1]), search_heuristic=search_heuristic, cache=cache)
+    else:
+        serve_stream(grid, goal, sys.stdin, sys.stdout, search_heuristic, cache)
@@ -0,0 +1,125 @@
+import sys
+import time
+import random
+import tracemalloc
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import searchmain
+
+try:
+    import resource # Peak resident memory of a process (not available on Windows)
+except ImportError:
+    resource = None
+
+# Search method name (as used on the searchmain.py command line) -> (function name, whether it takes a heuristic), for --baseline
+# revisions of searchmain.py older than its SEARCH_METHODS table; newer ones (and the current one) are benchmarked from that table
+METHODS = {
+    "DFS": ("depth_first_search", False),
+    "BFS": ("breadth_first_search", False),
+    "UCS": ("uniform_cost_search", False),
+    "CUS1": ("custom_search_1", False),
+    "GBFS": ("greedy_best_first_search", True),
+    "AS": ("a_star_search", True),
+    "CUS2": ("custom_search_2", True),
+    "JPS": ("jump_point_search", True),
+    "BiBFS": ("bidirectional_breadth_first_search", False),
+    "BiAS": ("bidirectional_a_star_search", True),
+    "IDAS": ("iterative_deepening_a_star_search", True),
+}
+
+def peak_rss_kib(): # Peak resident memory of this process so far in KiB, or None where the platform cannot tell
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # Reported in bytes on macOS, KiB elsewhere
+
+def search_methods(module): # Method name -> (search function, whether it takes a heuristic) for a copy of searchmain.py
+    if hasattr(module, "SEARCH_METHODS"):
+        return module.SEARCH_METHODS
+    return {method: (getattr(module, name), informed) for method, (name, informed) in METHODS.items() if hasattr(module, name)}
+
+def load_module(path, name="baseline_searchmain"): # Import another copy of searchmain.py (e.g. an older revision) to compare against
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# Open floor of size x size with sparse random rectangular walls, start at the top-left corner and goal at the bottom-right one
+def open_field(module, size, seed=0, wall_count=None):
+    rng = random.Random(seed)
+    grid = module.Grid(size, size)
+    start, goal = (0, 0), (size - 1, size - 1)
+    if wall_count is None:
+        wall_count = size // 2
+    for _ in range(wall_count):
+        x, y = rng.randrange(size), rng.randrange(size)
+        w, h = rng.randint(1, max(1, size // 20)), rng.randint(1, max(1, size // 20))
+        if x <= start[0] < x + w and y <= start[1] < y + h or x <= goal[0] < x + w and y <= goal[1] < y + h:
+            continue # Keep start and goal cells empty
+        grid.add_wall(x, y, w, h)
+    return grid, start, goal
+
+def run(module, method, grid, start, goal, measure_memory=False): # Time (and optionally trace peak memory of) one search
+    search, informed = search_methods(module)[method]
+    args = (grid, start, goal, module.heuristic) if informed else (grid, start, goal)
+    if measure_memory:
+        tracemalloc.start()
+    began = time.perf_counter()
+    path, total_nodes, traversed = search(*args)
+    elapsed = time.perf_counter() - began
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"path_length": len(path) if path else 0, "total_nodes": total_nodes, "seconds": elapsed, "peak_bytes": peak}
+
+# Peak resident memory of one search, measured in a fresh process that only builds the map and runs that search (tracemalloc only sees
+# Python allocations; this also covers arrays, interpreter overhead and memory freed but not returned to the system)
+def isolated_rss(module_path, method, size): # Executed in a worker process; module_path None means the current searchmain
+    module = searchmain if module_path is None else load_module(module_path)
+    grid, start, goal = open_field(module, size)
+    run(module, method, grid, start, goal)
+    return peak_rss_kib()
+
+def measure_rss(module_path, method, size):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(isolated_rss, module_path, method, size).result()
+
+def report(label, method, size, result):
+    peak = f"{result['peak_bytes'] / 2 ** 20:9.1f} MiB" if result["peak_bytes"] is not None else "        -    "
+    rate = result["total_nodes"] / result["seconds"] if result["seconds"] else 0 # Expansions per second
+    rss = f" {result['peak_rss_kib'] / 2 ** 10:9.1f} MiB" if result.get("peak_rss_kib") is not None else ""
+    print(f"{label:<10} {method:<5} {size:>6} {result['path_length']:>8} {result['total_nodes']:>10} {result['seconds']:>9.3f} s {rate:>11.0f} {peak}{rss}")
+
+# Usage: python benchmark.py [--baseline path/to/old/searchmain.py] [--methods BFS,AS] [--rss] size [size ...]
+# --rss adds the peak resident memory of each search, run again in a fresh process
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    modules = [("current", searchmain, None)] # (label, module, path to load it from in a fresh process)
+    methods = ["BFS"]
+    if "--baseline" in args:
+        position = args.index("--baseline")
+        modules.append(("baseline", load_module(args[position + 1]), args[position + 1]))
+        del args[position:position + 2]
+    measure_peak_rss = "--rss" in args and resource is not None
+    if "--rss" in args:
+        args.remove("--rss")
+    if "--methods" in args:
+        position = args.index("--methods")
+        methods = args[position + 1].split(",")
+        del args[position:position + 2]
+    sizes = [int(arg) for arg in args] or [200, 500, 1000]
+
+    rss_header = f" {'peak RSS':>13}" if measure_peak_rss else ""
+    print(f"{'module':<10} {'meth':<5} {'size':>6} {'path_len':>8} {'nodes':>10} {'time':>11} {'nodes/s':>11} {'peak mem':>13}{rss_header}")
+    for size in sizes:
+        for method in methods:
+            for label, module, module_path in modules:
+                grid, start, goal = open_field(module, size)
+                result = run(module, method, grid, start, goal) # Timed without tracing overhead
+                result["peak_bytes"] = run(module, method, grid, start, goal, measure_memory=True)["peak_bytes"]
+                if measure_peak_rss:
+                    result["peak_rss_kib"] = measure_rss(module_path, method, size)
+                report(label, method, size, result)
@@ -0,0 +1,128 @@
+import json
+import sqlite3
+import hashlib
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+
+from searchmain import Node, ExpansionCounter, goal_set, run_search
+
+# Result cache for repeated queries on the same map. A query is keyed by a content hash of the Grid (walls, terrain costs, size and
+# neighbourhood) plus its start, goal(s), method, heuristic and search options, so a hit returns the path and node count of the search
+# that answered it first without searching again. The most recently used results are kept in memory (least recently used evicted
+# first); with a file, results are also written to a SQLite table and read back on a memory miss, e.g. by the next process.
+# Invalidation follows the map: a grid whose walls, costs or neighbourhood changed (Grid.version moved on) hashes differently, so no
+# result found on its old content is returned, and those results are dropped from memory. The file keeps them, as the map file itself
+# may still hold that content; discard() removes them there too. Searches bounded by time (ARA*'s time_budget) are not cached since
+# their result depends on the machine's speed, and neither are searches with a heuristic the key cannot tell apart from another (any
+# callable but ALT: two lambdas or functools.partial objects share a name); neither is the traversed list (None, as when streaming).
+
+DEFAULT_CAPACITY = 4096 # Results kept in memory
+
+def grid_digest(grid): # Content hash of a grid: equal for two grids on which every search behaves the same
+    digest = hashlib.blake2b(f"{grid.rows} {grid.cols} {grid.diagonal} {grid.corner_cutting}".encode(), digest_size=16)
+    digest.update(grid.cells)
+    if grid.costs is not None:
+        digest.update(grid.costs)
+    return digest.hexdigest()
+
+def known_heuristic(heuristic): # Whether the key can tell the heuristic apart from any other: the default one (None) or ALT
+    return heuristic is None or getattr(heuristic, "landmarks", None) is not None
+
+def heuristic_key(heuristic): # Identifies a known heuristic in the key: None for the default one, ALT by its landmarks
+    return None if heuristic is None else ["ALT", list(heuristic.landmarks)]
+
+class ResultCache:
+    def __init__(self, capacity=DEFAULT_CAPACITY, path=None, search=run_search):
+        self.capacity = capacity
+        self.run_search = search # Answers misses: searchmain.py run as a script passes its own, the one profiling instruments
+        self.results = OrderedDict() # (map digest, query key) -> (path as flat array of x, y pairs or None, total nodes), oldest first
+        self.digests = weakref.WeakKeyDictionary() # Grid -> (version, digest) when it was last hashed
+        self.hits = self.misses = 0
+        self.lock = threading.Lock() # batch.py answers socket clients from several threads
+        self.database = None
+        if path is not None:
+            self.database = sqlite3.connect(path, check_same_thread=False)
+            self.database.execute("PRAGMA journal_mode=WAL") # Readers in other processes are not blocked by writes
+            self.database.execute("CREATE TABLE IF NOT EXISTS results (map TEXT, query TEXT, path BLOB, total_nodes INTEGER, "
+                                  "PRIMARY KEY (map, query))")
+            self.database.commit()
+
+    def digest(self, grid): # Hash of the grid's current content, recomputed only after it changed
+        with self.lock:
+            known = self.digests.get(grid)
+        if known is not None and known[0] == grid.version:
+            return known[1]
+        digest = grid_digest(grid)
+        with self.lock:
+            self.digests[grid] = (grid.version, digest)
+        if known is not None and known[1] != digest:
+            self._forget(known[1]) # The map changed: what was found on its old content no longer applies to it
+        return digest
+
+    def search(self, grid, start, goal, method, heuristic=None, **options): # run_search() through the cache: (path, total_nodes, None)
+        if not known_heuristic(heuristic) or "time_budget" in options or any(callable(value) for value in options.values()):
+            path, total_nodes, _ = self.run_search(grid, start, goal, method, heuristic, ExpansionCounter(), **options)
+            return path, total_nodes, None
+        variant = sorted(options.items())
+        if method == "HPA": # Paths depend on the size of the clusters in use
+            from hpa import cluster_size
+            variant.append(("clusters", cluster_size(grid)))
+        key = (self.digest(grid), json.dumps([method, list(start), sorted(goal_set(goal)), heuristic_key(heuristic), variant]))
+        result = self.lookup(key)
+        if result is None:
+            path, total_nodes, _ = self.run_search(grid, start, goal, method, heuristic, ExpansionCounter(), **options)
+            result = (array('i', [coordinate for node in path for coordinate in (node.x, node.y)]) if path else None, total_nodes)
+            self.store(key, result)
+        flat, total_nodes = result
+        return ([Node(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)] if flat else flat), total_nodes, None
+
+    def lookup(self, key): # Cached result or None, from memory first, then from the file
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return result
+            if self.database is not None:
+                row = self.database.execute("SELECT path, total_nodes FROM results WHERE map = ? AND query = ?", key).fetchone()
+                if row is not None:
+                    result = (array('i', row[0]) if row[0] is not None else None, row[1])
+                    self._remember(key, result)
+                    self.hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def store(self, key, result):
+        with self.lock:
+            self._remember(key, result)
+            if self.database is not None:
+                flat, total_nodes = result
+                self.database.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                      key + (flat.tobytes() if flat is not None else None, total_nodes))
+                self.database.commit()
+
+    def _remember(self, key, result): # Add to memory, evicting the least recently used result beyond capacity (lock held)
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+    def _forget(self, digest): # Drop the results found on the map with this content hash from memory
+        with self.lock:
+            for key in [key for key in self.results if key[0] == digest]:
+                del self.results[key]
+
+    def discard(self, digest): # Forget every result found on the map with this content hash, in memory and in the file
+        self._forget(digest)
+        with self.lock:
+            if self.database is not None:
+                self.database.execute("DELETE FROM results WHERE map = ?", (digest,))
+                self.database.commit()
+
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+            self.database = None
@@ -0,0 +1,496 @@
+import sys
+import math
+import heapq
+import random
+import os
+import tempfile
+from functools import partial
+
+import searchmain
+from searchmain import Grid, CORNER_RULES, SEARCH_METHODS, run_search, path_cost, distance_field, field_path, heuristic
+from landmarks import build_landmarks
+from replan import DStarLite
+from hpa import abstraction_for
+from cache import ResultCache
+
+# Randomized checks of the searches and of the Grid against brute-force references, on small random maps (walls, terrain costs, 4 or
+# 8 moves under each corner rule) with random starts and goals. The references below write the neighbourhood rules out again move by
+# move instead of going through Grid.neighbours(), and search with a plain Dijkstra. Each check_* function compares one part of the
+# code on rounds maps and returns how many of them failed, printing what went wrong.
+
+SMA_EXPANSION_LIMIT = 200000 # SMA* with a budget far below what the map needs may thrash for long: such cases are skipped
+
+class ExpansionLimit(Exception):
+    pass
+
+class LimitedExpansions: # on_expand that stops a search after limit expansions
+    def __init__(self, limit):
+        self.remaining = limit
+
+    def __call__(self, position):
+        self.remaining -= 1
+        if self.remaining < 0:
+            raise ExpansionLimit()
+
+def legal_move(grid, current, child): # Neighbourhood rules of Grid, written out move by move
+    dx, dy = child[0] - current[0], child[1] - current[1]
+    if max(abs(dx), abs(dy)) != 1 or not grid.is_valid(*child):
+        return False
+    if dx and dy:
+        if not grid.diagonal:
+            return False
+        walls_beside = grid.is_wall(current[0], child[1]) + grid.is_wall(child[0], current[1])
+        return walls_beside <= CORNER_RULES.index(grid.corner_cutting)
+    return True
+
+def moves_from(grid, current):
+    return [(current[0] + dx, current[1] + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            if (dx or dy) and grid.in_bounds(current[0] + dx, current[1] + dy) and legal_move(grid, current, (current[0] + dx, current[1] + dy))]
+
+def move_cost(grid, current, child):
+    return grid.cost(*child) * (math.sqrt(2) if current[0] != child[0] and current[1] != child[1] else 1)
+
+# Reference Dijkstra: (cost of the cheapest path from start to a goal, fewest nodes on such a path), or None when no goal is reachable
+def reference(grid, start, goals):
+    best = {start: (0, 1)}
+    open_list = [(0, 1, start)]
+    while open_list:
+        cost, nodes, current = heapq.heappop(open_list)
+        if (cost, nodes) > best[current]:
+            continue
+        if current in goals:
+            return cost, nodes
+        for child in moves_from(grid, current):
+            key = (cost + move_cost(grid, current, child), nodes + 1)
+            known = best.get(child)
+            if known is None or (round(key[0], 9), key[1]) < (round(known[0], 9), known[1]):
+                best[child] = key
+                heapq.heappush(open_list, key + (child,))
+    return None
+
+def reference_steps(grid, sources): # Plain BFS: fewest moves from the nearest source to every cell reached, by (x, y)
+    steps = {tuple(source): 0 for source in sources if grid.is_valid(*source)}
+    frontier = list(steps)
+    while frontier:
+        next_frontier = []
+        for current in frontier:
+            for child in moves_from(grid, current):
+                if child not in steps:
+                    steps[child] = steps[current] + 1
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return steps
+
+def random_grid(rng, max_size):
+    rows, cols = rng.randint(1, max_size), rng.randint(1, max_size)
+    grid = Grid(rows, cols)
+    if rng.random() < 0.5:
+        grid.set_moves(8, rng.choice(CORNER_RULES))
+    if rng.random() < 0.3:
+        grid.add_cost(rng.randrange(rows), rng.randrange(cols), rng.randint(1, 9), rng.randint(1, 9), rng.randint(2, 9))
+    for _ in range(rng.randint(0, rows * cols // 8)):
+        grid.add_wall(rng.randrange(rows), rng.randrange(cols), rng.randint(1, 4), rng.randint(1, 4))
+    return grid
+
+def random_query(rng, grid): # (start, goals) with an empty start, or None when the map has no empty cell
+    empty = [(x, y) for x in range(grid.rows) for y in range(grid.cols) if grid.is_valid(x, y)]
+    if not empty:
+        return None
+    return rng.choice(empty), [(rng.randrange(grid.rows), rng.randrange(grid.cols)) for _ in range(rng.randint(1, 3))]
+
+def path_problem(grid, path, start, goals): # What is wrong with a path from start to one of goals, or None
+    if (path[0].x, path[0].y) != tuple(start):
+        return "does not begin at the start"
+    if (path[-1].x, path[-1].y) not in goals:
+        return "does not end at a goal"
+    for current, child in zip(path, path[1:]):
+        if not legal_move(grid, (current.x, current.y), (child.x, child.y)):
+            return f"illegal move {(current.x, current.y)} -> {(child.x, child.y)}"
+    return None
+
+def cost_problem(grid, path, start, goals, expected): # Compare a search result to the reference cost
+    if not path or expected is None: # Searches return None or [] when no goal is reachable
+        return None if not path and expected is None else f"found {bool(path)}, reference {expected}"
+    return path_problem(grid, path, start, goals) or (None if abs(path_cost(grid, path) - expected) < 1e-6
+                                                     else f"cost {path_cost(grid, path)}, reference {expected}")
+
+# Grid.neighbours() of every empty cell against the rules written out above
+def check_neighbourhood(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 18)
+        for index in range(grid.rows * grid.cols):
+            if grid.cells[index]:
+                continue
+            found = sorted(grid.coords(child) for child in grid.neighbours(index))
+            expected = sorted(moves_from(grid, grid.coords(index)))
+            if found != expected:
+                failures += 1
+                print(f"neighbourhood case {case}: {grid.coords(index)} has {found}, expected {expected}")
+                break
+    return failures
+
+# Path cost of the optimal searches against the reference
+def check_optimal(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 18)
+        query = random_query(rng, grid)
+        if query is None:
+            continue
+        start, goals = query
+        result = reference(grid, start, set(goals))
+        expected = result[0] if result else None
+        for method in ("UCS", "AS", "JPS", "BiAS", "IDAS"):
+            path, _, _ = run_search(grid, start, goals, method)
+            problem = cost_problem(grid, path, start, goals, expected)
+            if problem:
+                failures += 1
+                print(f"{method} case {case}: {problem}")
+    return failures
+
+# Path cost of the informed searches with the ALT heuristic against the reference, also when a goal outside of the map (which the
+# searches ignore) is asked for and the heuristic has no table entry for it
+def check_alt(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 18)
+        query = random_query(rng, grid)
+        if query is None:
+            continue
+        start, goals = query
+        result = reference(grid, start, set(goals))
+        expected = result[0] if result else None
+        alt = build_landmarks(grid, 3)
+        outside = goals + [(grid.rows + rng.randint(0, 5), rng.randint(-5, grid.cols + 5))]
+        for method in ("AS", "BiAS", "IDAS", "ARA"):
+            for asked in (goals, outside):
+                path, _, _ = run_search(grid, start, asked, method, alt)
+                problem = cost_problem(grid, path, start, goals, expected)
+                if problem:
+                    failures += 1
+                    print(f"{method} with ALT case {case} (goals {asked}): {problem}")
+    return failures
+
+# D* Lite's path cost against the reference after each of a series of random wall changes and moves of the start along the path
+def check_replanning(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 15)
+        query = random_query(rng, grid)
+        if query is None:
+            continue
+        start, goals = query
+        goals = [goal for goal in goals if grid.is_valid(*goal)] or [start]
+        planner = DStarLite(grid, start, goals)
+        for step in range(12):
+            path, _, _ = planner.plan()
+            result = reference(grid, planner.start, set(goals)) if grid.is_valid(*planner.start) else None
+            problem = cost_problem(grid, path, planner.start, goals, result[0] if result else None)
+            if problem:
+                failures += 1
+                print(f"D* Lite case {case} step {step}: {problem}")
+                break
+            change = rng.random()
+            x, y, w, h = rng.randrange(grid.rows), rng.randrange(grid.cols), rng.randint(1, 2), rng.randint(1, 2)
+            if change < 0.4:
+                planner.add_wall(x, y, w, h)
+            elif change < 0.7:
+                planner.remove_wall(x, y, w, h)
+            elif path and len(path) > 1:
+                planner.move_start((path[1].x, path[1].y))
+    return failures
+
+# ARA*: the last path optimal, and every path reported along the way (through on_improve) within its bound of the optimum
+def check_ara(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 25)
+        query = random_query(rng, grid)
+        if query is None:
+            continue
+        start, goals = query
+        result = reference(grid, start, set(goals))
+        improvements = [] # (cost, bound) of every path reported
+        path, _, _ = run_search(grid, start, goals, "ARA", on_improve=lambda found, bound: improvements.append((path_cost(grid, found), bound)))
+        problem = cost_problem(grid, path, start, goals, result[0] if result else None)
+        if not problem and result:
+            if not improvements or improvements[-1][1] != 1.0:
+                problem = f"last bound reported {improvements[-1][1] if improvements else None}, not 1.0"
+            for cost, bound in improvements:
+                if bound < 1 or cost > bound * result[0] + 1e-9:
+                    problem = f"path of cost {cost} reported within bound {bound}, cheapest is {result[0]}"
+        if problem:
+            failures += 1
+            print(f"ARA case {case}: {problem}")
+    return failures
+
+# SMA*: a legal path of at most node_budget nodes, optimal whenever a cheapest path fits in the budget. Budgets are drawn around the
+# fewest nodes on a cheapest path, so both sides of that limit are tried.
+def check_sma(rng, rounds):
+    failures = skipped = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 18)
+        query = random_query(rng, grid)
+        if query is None:
+            continue
+        start, goals = query
+        result = reference(grid, start, set(goals))
+        if result is None:
+            continue
+        cost, nodes = result
+        budget = rng.choice([max(nodes - 1, 1), nodes, nodes + 1, nodes * 2, 1000])
+        try:
+            path, _, _ = run_search(grid, start, goals, "SMA", on_expand=LimitedExpansions(SMA_EXPANSION_LIMIT), node_budget=budget)
+        except ExpansionLimit:
+            skipped += 1
+            continue
+        if path:
+            problem = path_problem(grid, path, start, goals) or (f"path of {len(path)} nodes" if len(path) > budget else None)
+            if not problem and nodes <= budget and abs(path_cost(grid, path) - cost) > 1e-6:
+                problem = f"cost {path_cost(grid, path)}, reference {cost}"
+        else:
+            problem = "no path, though a cheapest one fits" if nodes <= budget else None
+        if problem:
+            failures += 1
+            print(f"SMA case {case} (budget {budget}, cheapest path of {nodes} nodes): {problem}")
+    if skipped:
+        print(f"SMA*: {skipped} case(s) skipped after {SMA_EXPANSION_LIMIT} expansions")
+    return failures
+
+# Grid.components() against BFS reachability from every empty cell, and Grid.reachable() against the reference search, both again
+# after a random wall change or neighbourhood switch (which must drop the cached labels)
+def check_components(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 15)
+        for change in range(2):
+            if change:
+                x, y, w, h = rng.randrange(grid.rows), rng.randrange(grid.cols), rng.randint(1, 3), rng.randint(1, 3)
+                kind = rng.randrange(3)
+                if kind == 0:
+                    grid.add_wall(x, y, w, h)
+                elif kind == 1:
+                    grid.remove_wall(x, y, w, h)
+                else:
+                    grid.set_moves(rng.choice([4, 8]), rng.choice(CORNER_RULES))
+            labels = grid.components()
+            problem = None
+            seen = set() # Empty cells of the regions compared so far
+            for index in range(grid.rows * grid.cols):
+                if grid.cells[index]:
+                    if labels[index] != -1:
+                        problem = f"wall {grid.coords(index)} labelled {labels[index]}"
+                elif grid.coords(index) not in seen:
+                    region = set(reference_steps(grid, [grid.coords(index)]))
+                    seen |= region
+                    same = {grid.coords(other) for other in range(grid.rows * grid.cols) if labels[other] == labels[index]}
+                    if same != region:
+                        problem = f"{grid.coords(index)} labelled with {len(same)} cells, reaches {len(region)}"
+                if problem:
+                    break
+            query = random_query(rng, grid)
+            if not problem and query is not None:
+                start, goals = query
+                if grid.reachable(start, goals) != (reference(grid, start, set(goals)) is not None):
+                    problem = f"reachable({start}, {goals}) is {grid.reachable(start, goals)}"
+            if problem:
+                failures += 1
+                print(f"components case {case}{' after a change' if change else ''}: {problem}")
+                break
+    return failures
+
+# Grid.add_walls() against painting the same rectangles one at a time with add_wall(), with and without NumPy: the same cells, the
+# count of rectangles entirely outside of the map, labels dropped after painting, and an invalid rectangle leaving the grid unchanged
+def check_add_walls(rng, rounds):
+    failures = 0
+    numpy = searchmain.np
+    for case in range(rounds):
+        rows, cols = rng.randint(1, 30), rng.randint(1, 30)
+        span = rng.choice([4, rows + cols]) # Large rectangles overlap enough for the difference-array sweep
+        rects = [(rng.randrange(rows + 3), rng.randrange(cols + 3), rng.randint(0, span), rng.randint(0, span))
+                 for _ in range(rng.randint(0, 40))]
+        expected = Grid(rows, cols)
+        for rect in rects:
+            expected.add_wall(*rect)
+        expected_outside = sum(1 for x, y, w, h in rects if x >= rows or y >= cols)
+        problem = None
+        try:
+            for label, module in (("NumPy", numpy), ("plain", None)):
+                searchmain.np = module
+                grid = Grid(rows, cols)
+                grid.components()
+                outside = grid.add_walls(rects)
+                if grid.cells != expected.cells:
+                    problem = f"{label}: cells differ from add_wall()"
+                elif outside != expected_outside:
+                    problem = f"{label}: {outside} rectangle(s) reported outside, expected {expected_outside}"
+                elif list(grid.components()) != list(expected.components()):
+                    problem = f"{label}: component labels not refreshed"
+                else:
+                    grid = Grid(rows, cols)
+                    try:
+                        grid.add_walls(rects + [(0, 0, -1, 1)])
+                        problem = f"{label}: negative size accepted"
+                    except ValueError:
+                        if any(grid.cells):
+                            problem = f"{label}: invalid rectangle left walls painted"
+                if problem:
+                    break
+        finally:
+            searchmain.np = numpy
+        if problem:
+            failures += 1
+            print(f"add_walls case {case} ({rows}x{cols}, {len(rects)} rectangles): {problem}")
+    return failures
+
+# HPA* is not optimal, so its paths are held to what it does promise: a legal path exactly when the reference reaches a goal, never
+# cheaper than the reference. Clusters of 2 to 8 cells cut small maps into many; the query is asked again after a wall change, when
+# the graph kept for the grid must be rebuilt.
+def check_hpa(rng, rounds):
+    failures = 0
+    for case in range(rounds):
+        grid = random_grid(rng, 25)
+        query = random_query(rng, grid)
+        if query is None:
+            continue
+        start, goals = query
+        abstraction_for(grid, rng.randint(2, 8))
+        for change in range(2):
+            if change:
+                grid.add_wall(rng.randrange(grid.rows), rng.randrange(grid.cols), rng.randint(1, 3), rng.randint(1, 3))
+                if not grid.is_valid(*start): # Walled in: every search answers that by its own rules
+                    break
+            result = reference(grid, start, set(goals))
+            path, _, _ = run_search(grid, start, goals, "HPA")
+            if not path or result is None:
+                problem = None if not path and result is None else f"found {bool(path)}, reference {result}"
+            else:
+                problem = path_problem(grid, path, start, goals)
+                if not problem and path_cost(grid, path) < result[0] - 1e-6:
+                    problem = f"cost {path_cost(grid, path)} below the optimum {result[0]}"
+            if problem:
+                failures += 1
+                print(f"HPA case {case}{' after a wall change' if change else ''}: {problem}")
+                break
+    return failures
+
+# distance_field() against a plain BFS from the same sources, through NumPy with every layer vectorized or none, and without NumPy:
+# the same distances and parents in all three, and field_path() giving a legal path of that many moves from a source to every cell
+def check_distance_field(rng, rounds):
+    failures = 0
+    numpy, sparse_frontier = searchmain.np, searchmain.SPARSE_FRONTIER
+    for case in range(rounds):
+        grid = random_grid(rng, 30)
+        sources = [(rng.randrange(grid.rows), rng.randrange(grid.cols)) for _ in range(rng.randint(1, 3))]
+        steps = reference_steps(grid, sources)
+        expected = [steps.get(grid.coords(index), -1) for index in range(grid.rows * grid.cols)]
+        fields = []
+        try:
+            for label, module, frontier in (("vectorized", numpy, 1), ("Python layers", numpy, grid.rows * grid.cols + 1),
+                                            ("plain", None, sparse_frontier)):
+                searchmain.np, searchmain.SPARSE_FRONTIER = module, frontier
+                fields.append((label,) + distance_field(grid, sources, parents=True))
+        finally:
+            searchmain.np, searchmain.SPARSE_FRONTIER = numpy, sparse_frontier
+        problem = None
+        for label, distance, parent in fields:
+            if list(distance) != expected:
+                problem = f"{label}: distances differ from BFS"
+            elif list(parent) != list(fields[0][2]):
+                problem = f"{label}: parents differ from {fields[0][0]}"
+            if problem:
+                break
+        if not problem:
+            distance, parent = fields[0][1:]
+            for index in range(grid.rows * grid.cols):
+                path = field_path(grid, distance, parent, grid.coords(index))
+                if distance[index] == -1:
+                    problem = f"path to unreached {grid.coords(index)}" if path is not None else None
+                elif len(path) - 1 != distance[index] or (path[0].x, path[0].y) not in sources:
+                    problem = f"path to {grid.coords(index)} of {len(path) - 1} moves, distance {distance[index]}"
+                else:
+                    problem = path_problem(grid, path, (path[0].x, path[0].y), [grid.coords(index)])
+                if problem:
+                    break
+        if problem:
+            failures += 1
+            print(f"distance field case {case}: {problem}")
+    return failures
+
+# ResultCache.search() against a fresh search with every method: on a miss, on a memory hit, on a hit read back from the file by a
+# second cache, and after a wall change (when no result found before it may be returned). Heuristics other than the default one and
+# ALT (here a functools.partial) must not share entries: both Manhattan and Euclidean distances are asked for.
+def check_cache(rng, rounds):
+    failures = 0
+    directory = tempfile.mkdtemp()
+    try:
+        for case in range(rounds):
+            grid = random_grid(rng, 12)
+            query = random_query(rng, grid)
+            if query is None:
+                continue
+            start, goals = query
+            method = rng.choice(list(SEARCH_METHODS))
+            heuristics = [None, build_landmarks(grid, 2), partial(heuristic, htype=1), partial(heuristic, htype=2)]
+            path_file = os.path.join(directory, f"{case}.sqlite")
+            cache = ResultCache(path=path_file)
+            problem = None
+            for round_number, label in enumerate(("miss", "memory hit", "file hit", "after a wall change")):
+                if round_number == 2:
+                    cache.close()
+                    cache = ResultCache(path=path_file)
+                elif round_number == 3:
+                    grid.add_wall(rng.randrange(grid.rows), rng.randrange(grid.cols), rng.randint(1, 3), rng.randint(1, 3))
+                for search_heuristic in heuristics:
+                    path, total_nodes, _ = cache.search(grid, start, goals, method, search_heuristic)
+                    fresh_path, fresh_nodes, _ = run_search(grid, start, goals, method, search_heuristic)
+                    cells = [(node.x, node.y) for node in path] if path else None
+                    fresh_cells = [(node.x, node.y) for node in fresh_path] if fresh_path else None
+                    if cells != fresh_cells or total_nodes != fresh_nodes:
+                        problem = f"{label} with {search_heuristic}: {total_nodes} nodes {cells}, fresh {fresh_nodes} nodes {fresh_cells}"
+                        break
+                if problem:
+                    break
+            cache.close()
+            if problem:
+                failures += 1
+                print(f"cache case {case} ({method}): {problem}")
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return failures
+
+CHECKS = [
+    ("neighbourhood", check_neighbourhood),
+    ("optimal searches", check_optimal),
+    ("ALT heuristic", check_alt),
+    ("D* Lite", check_replanning),
+    ("ARA*", check_ara),
+    ("SMA*", check_sma),
+    ("components", check_components),
+    ("add_walls", check_add_walls),
+    ("HPA*", check_hpa),
+    ("distance field", check_distance_field),
+    ("cache", check_cache),
+]
+
+# Usage: python check_searches.py [--seed N] [rounds]
+# Exits with status 1 when any check failed, printing each failing case
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    seed = 0
+    if "--seed" in args:
+        position = args.index("--seed")
+        seed = int(args[position + 1])
+        del args[position:position + 2]
+    rounds = int(args[0]) if args else 300
+    rng = random.Random(seed)
+
+    total = 0
+    for name, check in CHECKS:
+        failures = check(rng, rounds)
+        total += failures
+        print(f"{name}: {failures} failure(s) in {rounds} maps")
+    sys.exit(1 if total else 0)
@@ -0,0 +1,97 @@
+import os
+import sys
+import csv
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from searchmain import SEARCH_METHODS, ExpansionCounter, load_map, run_search, path_cost
+from benchmark import peak_rss_kib
+
+DEFAULT_METHODS = ["DFS", "BFS", "CUS1", "GBFS", "AS", "CUS2"]
+FIELDS = ["map", "method", "goal", "path_length", "path_cost", "total_nodes", "seconds", "peak_rss_kib", "error"]
+
+# Runs every method on every map as separate jobs spread over a process pool. Each map is parsed once in the parent and its Grid is
+# pickled in its compact form (zlib-compressed wall buffer) into each job. Every job runs in a fresh worker process so the peak
+# resident memory it reports belongs to that job alone.
+
+def run_job(map_name, grid, start, goal, method): # Executed in a worker process
+    began = time.perf_counter()
+    path, total_nodes, _ = run_search(grid, start, goal, method, on_expand=ExpansionCounter()) # Only counted: peak memory is the search's own
+    seconds = time.perf_counter() - began
+    return {
+        "map": map_name,
+        "method": method,
+        "goal": f"({path[-1].x}, {path[-1].y})" if path else None,
+        "path_length": len(path) - 1 if path else None,
+        "path_cost": path_cost(grid, path) if path else None,
+        "total_nodes": total_nodes,
+        "seconds": round(seconds, 6),
+        "peak_rss_kib": peak_rss_kib(),
+        "error": None,
+    }
+
+def map_files(paths): # Map files named on the command line, directories expanded to the text (.txt) and binary (.bmap) maps they contain
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith((".txt", ".bmap"))))
+        else:
+            files.append(path)
+    return files
+
+def compare(paths, methods=DEFAULT_METHODS, workers=None): # One result row per (map, method) job, in map then method order
+    rows, jobs = [], []
+    for filename in map_files(paths):
+        try:
+            grid, start, goal = load_map(filename)
+        except (OSError, ValueError, AttributeError, IndexError) as error: # Unreadable file or not in the map format
+            rows.append(dict.fromkeys(FIELDS) | {"map": filename, "error": f"Invalid map: {error}"})
+            continue
+        for method in methods:
+            jobs.append((filename, grid, start, goal, method))
+    if "forkserver" in multiprocessing.get_all_start_methods(): # Fresh workers are forked from a server that already imported the searches
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["searchmain", "compare"])
+    else:
+        context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1) as executor:
+        futures = [executor.submit(run_job, *job) for job in jobs]
+        for (filename, _, _, _, method), future in zip(jobs, futures):
+            try:
+                rows.append(future.result())
+            except Exception as error: # Failure inside one job is reported in its row instead of aborting the comparison
+                rows.append(dict.fromkeys(FIELDS) | {"map": filename, "method": method, "error": repr(error)})
+    return rows
+
+def write_rows(rows, output): # JSON when the output file ends in .json, CSV otherwise; "-" writes CSV to stdout
+    if output.endswith(".json"):
+        with open(output, "w") as file:
+            json.dump(rows, file, indent=2)
+        return
+    file = sys.stdout if output == "-" else open(output, "w", newline="")
+    try:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+# Usage: python compare.py <map file or directory> [...] [--methods DFS,BFS,...] [--workers N] [--output results.csv|results.json]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--methods": ",".join(DEFAULT_METHODS), "--workers": None, "--output": "-"}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+    methods = options["--methods"].split(",")
+    unknown = [method for method in methods if method not in SEARCH_METHODS]
+    if unknown or not args:
+        print(f"Unknown method(s): {', '.join(unknown)}" if unknown else "Usage: python compare.py <map file or directory> [...] [--methods DFS,BFS,...] [--workers N] [--output FILE]")
+        sys.exit(1)
+    workers = int(options["--workers"]) if options["--workers"] else None
+    write_rows(compare(args, methods, workers), options["--output"])
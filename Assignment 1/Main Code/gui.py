@@ -11,7 +11,7 @@ class GUI(tk.Tk):
         self.geometry(f"{window_width}x{window_height}") # Size of the GUI display window is designated to fit the map    
         self.grid = grid
         self.start = start
-        self.goal = [goal] # List of goal nodes
+        self.goal = list(goal) # List of goal nodes
         self.path = [Node(x, y) for x, y in path]
         self.traversed = [Node(x, y) for x, y in traversed] 
         self.cell_size = 30 # Each cell sized as a square 30x30
@@ -31,7 +31,7 @@ class GUI(tk.Tk):
                     self.canvas.create_rectangle(x0, y0, x1, y1, fill="lime")
                 elif (i, j) == self.start: # Match starting cell as red color
                     self.canvas.create_rectangle(x0, y0, x1, y1, fill="red")
-                elif self.grid.grid[i][j] == 1: # Wall cell(s) as gray color
+                elif self.grid.is_wall(i, j): # Wall cell(s) as gray color
                     self.canvas.create_rectangle(x0, y0, x1, y1, fill="dark gray")
                 elif (i, j) in self.traversed: # All explored cells as purple color
                     self.canvas.create_rectangle(x0, y0, x1, y1, fill="purple") 
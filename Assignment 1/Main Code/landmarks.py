@@ -0,0 +1,121 @@
+import struct
+import zlib
+from array import array
+
+from searchmain import np, distance_field, octile_heuristic
+
+# ALT (A*, Landmarks, Triangle inequality) heuristic. A few landmark cells are chosen once per map and a BFS from each stores the
+# distance to every cell. For any cell n and goal t, |d(L, t) - d(L, n)| <= d(n, t) for every landmark L, so the largest of these
+# differences (and Manhattan distance) is an admissible and consistent h(n) that follows walls instead of ignoring them. The tables count
+# moves, so they stay admissible with terrain costs and diagonal moves, where no move costs less than 1; the grid's default heuristic
+# (octile distance on an 8-connected grid) replaces Manhattan distance as the floor there.
+
+UNREACHED_16, UNREACHED_32 = 0xFFFF, 0xFFFFFFFF # Marks cells a landmark cannot reach in the uint16/uint32 tables
+FILE_MAGIC = b"ALT1" # Header of the tables file saved next to a map
+
+class LandmarkHeuristic:
+    def __init__(self, grid, landmarks, tables):
+        self.rows, self.cols = grid.rows, grid.cols
+        self.diagonal = grid.diagonal # Octile instead of Manhattan distance as the floor
+        self.landmarks = landmarks # Cell ids of the landmarks
+        self.tables = tables # One distance table (array of uint16 or uint32) per landmark, indexed by cell id
+        self.unreached = UNREACHED_16 if tables and tables[0].typecode == 'H' else UNREACHED_32
+        self._goal_distances = (None, []) # (goal, [(table, distance from landmark to goal)]) of the last goal asked for
+
+    def __call__(self, current, goal): # Same signature as heuristic(current, goal)
+        cached = self._goal_distances # Read once: the pair is replaced as a whole, so concurrent queries never mix two goals
+        if cached[0] != goal:
+            if 0 <= goal[0] < self.rows and 0 <= goal[1] < self.cols:
+                goal_id = goal[0] * self.cols + goal[1]
+                cached = (goal, [(table, table[goal_id]) for table in self.tables if table[goal_id] != self.unreached])
+            else: # A goal outside of the map (which searches ignore) has no table entry: only the floor applies
+                cached = (goal, [])
+            self._goal_distances = cached
+        current_id = current[0] * self.cols + current[1]
+        if self.diagonal:
+            best = octile_heuristic(current, goal)
+        else:
+            best = abs(current[0] - goal[0]) + abs(current[1] - goal[1]) # Manhattan distance as the floor
+        unreached = self.unreached
+        for table, goal_distance in cached[1]:
+            distance = table[current_id]
+            if distance != unreached:
+                difference = distance - goal_distance if distance > goal_distance else goal_distance - distance
+                if difference > best:
+                    best = difference
+        return best
+
+def build_landmarks(grid, count): # Farthest-point selection: each new landmark is the reachable cell farthest from all chosen so far
+    seed = next((index for index, cell in enumerate(grid.cells) if not cell), None)
+    if seed is None or count <= 0:
+        return LandmarkHeuristic(grid, [], [])
+    nearest = distance_field(grid, [grid.coords(seed)]) # Distance to the nearest landmark (to the seed before the first one)
+    landmarks, fields = [], []
+    near = np.frombuffer(nearest, dtype=np.int32) if np is not None else None
+    for _ in range(count):
+        landmark = max(range(len(nearest)), key=nearest.__getitem__) if near is None else int(np.argmax(near)) # First of the farthest
+        if nearest[landmark] <= 0:
+            break # Every reachable cell is already a landmark
+        landmarks.append(landmark)
+        field = distance_field(grid, [grid.coords(landmark)])
+        fields.append(field)
+        if near is not None: # Same update on whole arrays
+            far = np.frombuffer(field, dtype=np.int32)
+            np.copyto(near, far, where=(far != -1) & (far < near))
+            continue
+        for index, distance in enumerate(field):
+            if distance != -1 and distance < nearest[index]:
+                nearest[index] = distance
+    typecode = 'H' if max((max(field) for field in fields), default=0) < UNREACHED_16 else 'I' # uint16 when every distance fits
+    return LandmarkHeuristic(grid, landmarks, [pack_table(field, typecode) for field in fields])
+
+def pack_table(field, typecode): # Compact copy of a distance field, unreachable cells stored as the type's largest value
+    unreached = UNREACHED_16 if typecode == 'H' else UNREACHED_32
+    if np is not None: # -1 wraps around to the largest value of the unsigned type
+        return array(typecode, np.frombuffer(field, dtype=np.int32).astype(np.uint16 if typecode == 'H' else np.uint32).tobytes())
+    return array(typecode, (unreached if distance == -1 else distance for distance in field))
+
+def map_checksum(grid): # Identifies the wall layout and neighbourhood the tables were built for
+    return zlib.crc32(f"{grid.diagonal} {grid.corner_cutting}".encode(), zlib.crc32(grid.cells))
+
+def save_landmarks(landmark_heuristic, grid, path):
+    tables = landmark_heuristic.tables
+    typecode = tables[0].typecode.encode() if tables else b'H'
+    with open(path, 'wb') as file:
+        file.write(FILE_MAGIC + struct.pack('<IIIIc', grid.rows, grid.cols, map_checksum(grid), len(tables), typecode))
+        array('I', landmark_heuristic.landmarks).tofile(file)
+        for table in tables:
+            table.tofile(file)
+
+def load_landmarks(grid, path): # Tables saved for this exact map, or None when the file is missing, stale or from another map
+    header_size = len(FILE_MAGIC) + struct.calcsize('<IIIIc')
+    try:
+        with open(path, 'rb') as file:
+            header = file.read(header_size)
+            if len(header) != header_size or header[:len(FILE_MAGIC)] != FILE_MAGIC:
+                return None
+            rows, cols, checksum, count, typecode = struct.unpack('<IIIIc', header[len(FILE_MAGIC):])
+            if (rows, cols, checksum) != (grid.rows, grid.cols, map_checksum(grid)):
+                return None
+            landmarks = array('I')
+            landmarks.fromfile(file, count)
+            tables = []
+            for _ in range(count):
+                table = array(typecode.decode())
+                table.fromfile(file, rows * cols)
+                tables.append(table)
+    except (OSError, EOFError, ValueError):
+        return None
+    return LandmarkHeuristic(grid, list(landmarks), tables)
+
+def load_or_build_landmarks(grid, map_filename, count): # Reuse <map file>.alt when it matches the map, otherwise build and save it
+    path = map_filename + ".alt"
+    landmark_heuristic = load_landmarks(grid, path)
+    if landmark_heuristic is not None and len(landmark_heuristic.tables) >= count:
+        return LandmarkHeuristic(grid, landmark_heuristic.landmarks[:count], landmark_heuristic.tables[:count])
+    landmark_heuristic = build_landmarks(grid, count)
+    try:
+        save_landmarks(landmark_heuristic, grid, path)
+    except OSError:
+        pass # Read-only location: the tables are still used for this run
+    return landmark_heuristic
@@ -0,0 +1,102 @@
+import sys
+import mmap
+import struct
+from array import array
+
+from searchmain import Grid, load_map, CORNER_RULES
+
+try:
+    import numpy as np # Optional, only used to unpack bitset maps in one call
+except ImportError:
+    np = None
+
+# Binary map format (".bmap"), little-endian:
+#   header  magic b"BMAP", version (uint8), layout (uint8), flags (uint8), corner cutting rule (uint8, index in CORNER_RULES), rows,
+#           cols, start x, start y, goal count (uint32 each)
+#   goals   goal count (x, y) pairs of uint32
+#   cells   rows * cols cells in the Grid's row-major order, cell (x, y) at x * cols + y
+#   costs   only with the FLAG_COSTS flag: rows * cols bytes, the cost (1 to 255) of moving into each cell, in the same order
+# With the BYTES layout every cell is one byte (0 empty, 1 wall), exactly Grid's own buffer, so the loader maps the file and the
+# Grid reads its cells straight from the mapping: nothing is parsed or copied, and pages are only read in as the search touches them.
+# The BITSET layout packs 8 cells per byte (cell i is bit i % 8 of byte i // 8) for an 8 times smaller file, unpacked once on load.
+# Terrain costs are always one byte per cell and mapped directly.
+
+MAP_MAGIC = b"BMAP"
+MAP_VERSION = 1
+LAYOUT_BYTES, LAYOUT_BITSET = 0, 1
+FLAG_COSTS, FLAG_DIAGONAL = 1, 2 # Terrain cost section present; 8-connected grid
+HEADER = struct.Struct('<4sBBBBIIIII')
+
+def pack_bits(cells): # 8 cells per byte, least significant bit first
+    if np is not None:
+        return np.packbits(np.frombuffer(cells, dtype=np.uint8), bitorder='little').tobytes()
+    packed = bytearray((len(cells) + 7) // 8)
+    for index, cell in enumerate(cells):
+        if cell:
+            packed[index >> 3] |= 1 << (index & 7)
+    return packed
+
+def unpack_bits(packed, size): # Inverse of pack_bits(): one byte per cell
+    if np is not None:
+        return bytearray(np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=size, bitorder='little').tobytes())
+    cells = bytearray(size)
+    for index in range(size):
+        if packed[index >> 3] >> (index & 7) & 1:
+            cells[index] = 1
+    return cells
+
+def save_binary_map(grid, start, goal, filename, layout=LAYOUT_BYTES):
+    with open(filename, 'wb') as file:
+        flags = (FLAG_COSTS if grid.costs is not None else 0) | (FLAG_DIAGONAL if grid.diagonal else 0)
+        corners = CORNER_RULES.index(grid.corner_cutting)
+        file.write(HEADER.pack(MAP_MAGIC, MAP_VERSION, layout, flags, corners, grid.rows, grid.cols, start[0], start[1], len(goal)))
+        array('I', [value for position in goal for value in position]).tofile(file)
+        file.write(grid.cells if layout == LAYOUT_BYTES else pack_bits(grid.cells))
+        if grid.costs is not None:
+            file.write(grid.costs)
+
+def load_binary_map(filename): # Same result as load_map(): (grid, start, goal list)
+    with open(filename, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY) # Private copy-on-write: add_wall() never writes to the file
+    if len(mapping) < HEADER.size:
+        raise ValueError("Truncated binary map header.")
+    magic, version, layout, flags, corners, rows, cols, start_x, start_y, goal_count = HEADER.unpack_from(mapping)
+    if magic != MAP_MAGIC:
+        raise ValueError("Not a binary map file.")
+    if version != MAP_VERSION or layout not in (LAYOUT_BYTES, LAYOUT_BITSET) or corners >= len(CORNER_RULES):
+        raise ValueError(f"Unsupported binary map version {version}, layout {layout} or corner cutting rule {corners}.")
+    if not goal_count:
+        raise ValueError("No valid goal node found.") # For no goal node defined
+    offset = HEADER.size + 8 * goal_count
+    size = rows * cols
+    cells_length = size if layout == LAYOUT_BYTES else (size + 7) // 8
+    costs_length = size if flags & FLAG_COSTS else 0
+    if len(mapping) < offset + cells_length + costs_length:
+        raise ValueError("Truncated binary map.")
+    values = struct.unpack_from(f'<{2 * goal_count}I', mapping, HEADER.size)
+    goal = list(zip(values[0::2], values[1::2]))
+
+    costs = memoryview(mapping)[offset + cells_length:offset + cells_length + size] if costs_length else None
+    if layout == LAYOUT_BYTES:
+        cells = memoryview(mapping)[offset:offset + size] # Indexes, slices and writes like the bytearray it replaces
+    else:
+        cells = unpack_bits(mapping[offset:offset + cells_length], size)
+        if costs is None:
+            mapping.close()
+    grid = Grid(rows, cols, cells, costs)
+    grid.set_moves(8 if flags & FLAG_DIAGONAL else 4, CORNER_RULES[corners])
+    return grid, (start_x, start_y), goal
+
+# Usage: python mapfile.py <text map> <binary map> [--bitset]
+# Converts a map from the text format to the binary format. --bitset writes the packed layout (smaller file, unpacked on load)
+# instead of the one mapped directly.
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python mapfile.py <text map> <binary map> [--bitset]")
+        sys.exit(1)
+    try:
+        grid, start, goal = load_map(sys.argv[1])
+    except ValueError as error: # No goal in the map file
+        print(error)
+        sys.exit(1)
+    save_binary_map(grid, start, goal, sys.argv[2], LAYOUT_BITSET if "--bitset" in sys.argv else LAYOUT_BYTES)
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import time
+import heapq
+from collections import deque
+from contextlib import contextmanager
+
+# Per-phase timing and search-loop counters for one run of the pipeline (load the map, search, report the path). Nothing here runs
+# unless profiling is asked for: the search loops are not edited, instead instrument() swaps in counting stand-ins for what they call
+# (the heap functions, the deque class, Grid.neighbours() and the path builders) for the duration of one search, then restores them.
+#
+# Phase times are exclusive: a phase nested in another (e.g. "path" inside "search") is not counted again in the outer one, so the
+# phases add up to the profiled wall time. "path" covers reconstruct_path() and bidirectional_path(); DFS, the depth-first searches
+# and JPS (which fills in the cells between jump points) build their path inline, which stays in "search". HPA*'s searches live in
+# hpa.py: its heap operations are counted too (instrument() swaps the same stand-in into that module when it is loaded), and so are its
+# neighbour calls, but its path refinement runs inside "search".
+
+ENV_VARIABLE = "SEARCH_PROFILE" # "1" prints the summary to stderr, anything else is a file to write it to
+HELPER_MODULES = ["hpa"] # Modules with search loops of their own that searchmain calls into
+
+class Profile:
+    def __init__(self):
+        self.phases = {} # Phase name -> exclusive seconds, in the order phases were first entered
+        self.counters = {}
+        self._nested = [] # Seconds spent in inner phases, one entry per phase currently open
+
+    @contextmanager
+    def phase(self, name):
+        self._nested.append(0.0)
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - began
+            inner = self._nested.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - inner
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self): # JSON-ready dict
+        counters = dict(self.counters)
+        pops = counters.get("heap_pops", 0) + counters.get("queue_pops", 0)
+        if pops and "expansions" in counters: # Frontier entries popped but not expanded: stale heap entries and already visited cells
+            counters["duplicate_pops"] = max(pops - counters["expansions"], 0)
+        return {
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "total_seconds": round(sum(self.phases.values()), 6),
+            "counters": counters,
+        }
+
+    def report(self, destination=None): # JSON summary to a file, or to stderr when destination is None
+        text = json.dumps(self.summary(), indent=2)
+        if destination is None:
+            print(text, file=sys.stderr)
+        else:
+            with open(destination, "w") as file:
+                file.write(text + "\n")
+
+class _CountingHeapq: # Stands in for the heapq module inside the profiled module
+    def __init__(self, profile):
+        self.profile = profile
+
+    def heappush(self, heap, item):
+        self.profile.counters["heap_pushes"] = self.profile.counters.get("heap_pushes", 0) + 1
+        heapq.heappush(heap, item)
+
+    def heappop(self, heap):
+        self.profile.counters["heap_pops"] = self.profile.counters.get("heap_pops", 0) + 1
+        return heapq.heappop(heap)
+
+    def heapify(self, heap):
+        self.profile.count("heap_pushes", len(heap))
+        heapq.heapify(heap)
+
+def _counting_deque(profile): # deque subclass counting the FIFO frontier's pushes and pops
+    counters = profile.counters
+
+    class CountingDeque(deque):
+        def append(self, item):
+            counters["queue_pushes"] = counters.get("queue_pushes", 0) + 1
+            super().append(item)
+
+        def popleft(self):
+            counters["queue_pops"] = counters.get("queue_pops", 0) + 1
+            return super().popleft()
+
+    return CountingDeque
+
+@contextmanager
+def instrument(profile, module, grid): # Count the frontier and neighbour operations of searches in module (searchmain) on grid
+    counters = profile.counters
+    neighbours = grid.neighbours
+
+    def counting_neighbours(index):
+        result = neighbours(index)
+        counters["neighbour_calls"] = counters.get("neighbour_calls", 0) + 1
+        counters["neighbours_found"] = counters.get("neighbours_found", 0) + len(result)
+        return result
+
+    def timed(function): # Path builders run as the "path" phase
+        def wrapper(*args, **kwargs):
+            with profile.phase("path"):
+                return function(*args, **kwargs)
+        return wrapper
+
+    saved = {name: getattr(module, name) for name in ("heapq", "deque", "reconstruct_path", "bidirectional_path")}
+    helpers = [sys.modules[name] for name in HELPER_MODULES if name in sys.modules] # Imported ones only: they import searchmain
+    module.heapq = _CountingHeapq(profile)
+    for helper in helpers:
+        helper.heapq = module.heapq
+    module.deque = _counting_deque(profile)
+    module.reconstruct_path = timed(saved["reconstruct_path"])
+    module.bidirectional_path = timed(saved["bidirectional_path"])
+    grid.neighbours = counting_neighbours # Instance attribute shadowing the method, also seen by Grid.adjacent()
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+        for helper in helpers:
+            helper.heapq = heapq
+        del grid.neighbours
+
+def profile_requested(argv): # (enabled, destination) from a --profile [FILE] option or the SEARCH_PROFILE environment variable
+    if "--profile" in argv:
+        position = argv.index("--profile")
+        following = argv[position + 1] if position + 1 < len(argv) else None
+        return True, following if following and not following.startswith("--") else None
+    value = os.environ.get(ENV_VARIABLE)
+    if value:
+        return True, None if value == "1" else value
+    return False, None
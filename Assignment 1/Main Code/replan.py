@@ -0,0 +1,149 @@
+import sys
+import re
+import heapq
+from array import array
+
+from searchmain import Node, load_map, default_heuristic, goal_ids, get_direction
+
+# Incremental replanning with D* Lite. The search runs backwards, from the goal(s) towards the start: g(n) is the cost of the best
+# known path from n to the nearest goal and rhs(n) the one-step lookahead min over neighbours n' of c(n, n') + g(n'). Only cells where
+# the two disagree (locally inconsistent) sit in the open list. When walls appear or disappear, only the cells around the changed ones
+# get their rhs recomputed, and the next plan() expands just the inconsistencies that spread from there and can still affect the path
+# from the start, instead of searching the whole map again. The start may also move along the path (move_start()) between plans.
+
+class DStarLite:
+    def __init__(self, grid, start, goal, heuristic=None):
+        self.grid = grid
+        self.start = tuple(start)
+        self.goals = goal_ids(grid, goal)
+        self.heuristic = default_heuristic(grid) if heuristic is None else heuristic # Must be consistent, e.g. Manhattan or octile distance
+        size = grid.rows * grid.cols
+        self.g = array('d', [float('inf')]) * size # Cost from each cell id to the nearest goal, as of the last expansion of the cell
+        self.rhs = array('d', [float('inf')]) * size # One-step lookahead of g
+        self.km = 0 # Key modifier: how far the start has moved since the keys in the open list were computed
+        self.last = self.start # Start when km was last updated
+        self.open_list = [] # Lazy-deletion heap of (key 1, key 2, cell id); entries whose cell became consistent are skipped when popped
+        for goal_id in self.goals:
+            if not grid.cells[goal_id]:
+                self.rhs[goal_id] = 0
+                heapq.heappush(self.open_list, self.key(goal_id) + (goal_id,))
+
+    def key(self, cell): # (min(g, rhs) + h(start, cell) + km, min(g, rhs)): expand cheaper cells closer to the start first
+        best = min(self.g[cell], self.rhs[cell])
+        # Rounded so that sums of sqrt(2) steps that are equal, but were added up in a different order, compare equal (ties are then broken
+        # by the second part, as the algorithm needs to leave no cell on the path inconsistent)
+        return (round(best + self.heuristic(self.start, self.grid.coords(cell)) + self.km, 9), round(best, 9))
+
+    def update_cell(self, cell): # Recompute rhs(cell) and put the cell back in the open list when it is now inconsistent
+        grid = self.grid
+        if grid.cells[cell]:
+            self.rhs[cell] = float('inf') # A wall reaches nothing
+        elif cell in self.goals:
+            self.rhs[cell] = 0
+        else:
+            g, step_cost = self.g, grid.step_cost
+            self.rhs[cell] = min((step_cost(cell, child) + g[child] for child in grid.neighbours(cell)), default=float('inf'))
+        if self.g[cell] != self.rhs[cell]:
+            heapq.heappush(self.open_list, self.key(cell) + (cell,))
+
+    def plan(self, on_expand=None): # Repair the search and return (path, total nodes expanded by this call, traversed) like a search function
+        traversed = [] if on_expand is None else None # nodes explored by this call (streamed to on_expand instead when given)
+        expand = traversed.append if on_expand is None else on_expand
+        total_nodes = 0
+        grid, g, rhs, open_list = self.grid, self.g, self.rhs, self.open_list
+        if not grid.in_bounds(*self.start):
+            return None, total_nodes, traversed
+        start_id = grid.index(*self.start)
+        while open_list and (open_list[0][:2] < self.key(start_id) or rhs[start_id] != g[start_id]):
+            key_1, key_2, current = heapq.heappop(open_list)
+            if g[current] == rhs[current]:
+                continue # Stale entry: the cell became consistent since it was pushed
+            key = self.key(current)
+            if (key_1, key_2) < key:
+                heapq.heappush(open_list, key + (current,)) # Pushed before the start moved or its costs rose: reinsert with its key
+                continue
+            total_nodes += 1
+            expand(grid.coords(current))  # Add current node to traversed list (or stream it)
+            if g[current] > rhs[current]: # Overconsistent: its cost went down, settle it
+                g[current] = rhs[current]
+            else: # Underconsistent: its cost went up, invalidate it and let it be recomputed
+                g[current] = float('inf')
+                self.update_cell(current)
+            for neighbour in grid.neighbours(current):
+                self.update_cell(neighbour)
+        return self.path(), total_nodes, traversed
+
+    def path(self): # Follow the cheapest next step from the start down to a goal
+        grid, g = self.grid, self.g
+        current = grid.index(*self.start)
+        if g[current] == float('inf'):
+            return None
+        path = [Node(*self.start)]
+        while current not in self.goals:
+            current = min(grid.neighbours(current), key=lambda child: grid.step_cost(current, child) + g[child])
+            path.append(Node(*grid.coords(current)))
+        return path
+
+    def move_start(self, start): # The robot moved to start; keys already in the open list stay valid lower bounds thanks to km
+        self.km += self.heuristic(self.last, start)
+        self.start = self.last = tuple(start)
+
+    def add_wall(self, x, y, w, h): # Same rectangle as Grid.add_wall()
+        self._change(x, y, w, h, self.grid.add_wall)
+
+    def remove_wall(self, x, y, w, h): # Same rectangle as Grid.remove_wall()
+        self._change(x, y, w, h, self.grid.remove_wall)
+
+    def _change(self, x, y, w, h, apply): # Apply a wall change to the grid and recompute rhs around every cell it flipped
+        grid = self.grid
+        x0, x1 = max(x, 0), min(x + w, grid.rows)
+        y0, y1 = max(y, 0), min(y + h, grid.cols)
+        before = {(i, j): grid.cells[i * grid.cols + j] for i in range(x0, x1) for j in range(y0, y1)}
+        apply(x, y, w, h)
+        affected = set()
+        for (i, j), cell in before.items():
+            if grid.cells[i * grid.cols + j] != cell:
+                # The moves into and out of a flipped cell change, and so do diagonal moves that pass beside it: all start in its 3x3 block
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        if grid.in_bounds(i + dx, j + dy):
+                            affected.add(grid.index(i + dx, j + dy))
+        for cell in affected:
+            self.update_cell(cell)
+
+# Usage: python replan.py <map file> <changes file>
+# Plans once on the map, then applies each line of the changes file and replans: "+ (x, y, w, h)" adds a wall rectangle,
+# "- (x, y, w, h)" removes one and "> (x, y)" moves the start. Each plan is printed like searchmain.py does, with the nodes expanded
+# by that plan alone.
+def print_plan(path, total_nodes):
+    if path:
+        print(f"< Node ({path[-1].x}, {path[-1].y})> {total_nodes}")
+        print([get_direction(path[i], path[i+1]) for i in range(len(path)-1)])
+    else:
+        print(f"No goal is reachable; {total_nodes}")
+
+if __name__ == "__main__":
+    try:
+        grid, start, goal = load_map(sys.argv[1])
+    except ValueError as error: # No goal in the map file
+        print(error)
+        sys.exit(1)
+    planner = DStarLite(grid, start, goal)
+    path, total_nodes, _ = planner.plan()
+    print(f"{sys.argv[1]} D* Lite")
+    print_plan(path, total_nodes)
+    with open(sys.argv[2]) as file:
+        for line in file:
+            line = line.strip()
+            values = tuple(map(int, re.findall(r'\d+', line)))
+            if line.startswith('+') and len(values) == 4:
+                planner.add_wall(*values)
+            elif line.startswith('-') and len(values) == 4:
+                planner.remove_wall(*values)
+            elif line.startswith('>') and len(values) == 2:
+                planner.move_start(values)
+            else:
+                continue # Not a change line
+            print(line)
+            path, total_nodes, _ = planner.plan()
+            print_plan(path, total_nodes)
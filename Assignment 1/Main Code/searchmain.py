@@ -1,29 +1,282 @@
 import sys
 import re
+import math
+import time
+import zlib
 import heapq
+import operator
+import queue
+import threading
+import weakref
+from array import array
 from collections import deque
+from contextlib import nullcontext
+
+try:
+    import numpy as np # Optional, used to paint walls as whole rectangles and to expand wide BFS layers of distance fields
+except ImportError:
+    np = None
+
+# Neighbourhood model: the four straight moves always, plus the four diagonal ones on an 8-connected grid. A diagonal move passes
+# between the two cells beside it; the corner-cutting rule says how many of them may be walls: "never" (neither, the move cannot clip
+# a wall's corner), "no-squeeze" (one, but not slip between two walls touching at their corners) or "always" (any).
+STRAIGHT_MOVES = [(0, -1), (-1, 0), (0, 1), (1, 0)] # Up, Left, Down, Right
+DIAGONAL_MOVES = [(-1, -1), (-1, 1), (1, 1), (1, -1)] # Up-Left, Down-Left, Down-Right, Up-Right
+CORNER_RULES = ("never", "no-squeeze", "always") # Walls allowed beside a diagonal move: 0, 1 or 2
+SQRT2 = math.sqrt(2) # Length of a diagonal move
 
 class Grid:
-    def __init__(self, rows, cols):
+    def __init__(self, rows, cols, cells=None, costs=None):
         self.rows = rows
         self.cols = cols
-        self.grid = [[0] * cols for _ in range(rows)]  # Initialize map with all cells as 0 (empty)
+        # Row-major flat buffer, cell (x, y) stored at x * cols + y: 0 (empty) or 1 (wall). An existing writable buffer of that size
+        # (e.g. a memory-mapped binary map) can be used in place of a fresh one
+        self.cells = bytearray(rows * cols) if cells is None else cells
+        # Cost of moving into each cell (1 to 255) in the same layout, or None while every move costs 1 (the buffer is only allocated
+        # by the first add_cost())
+        self.costs = costs
+        self.diagonal = False # 8-connected when True, see set_moves()
+        self.corner_cutting = "never"
+        self._components = None # Connected-component labels, see components(); None until asked for or after the walls change
+        self.version = 0 # Bumped by every change to the walls, costs or neighbourhood, so caches built for the grid can tell they are stale
+
+    def set_moves(self, connectivity, corner_cutting="never"): # 4 (straight moves only) or 8 (straight and diagonal moves)
+        if connectivity not in (4, 8):
+            raise ValueError(f"Invalid connectivity {connectivity}: must be 4 or 8.")
+        if corner_cutting not in CORNER_RULES:
+            raise ValueError(f"Invalid corner cutting rule {corner_cutting}: must be one of {', '.join(CORNER_RULES)}.")
+        self.diagonal = connectivity == 8
+        self.corner_cutting = corner_cutting
+        self._changed()
+
+    def index(self, x, y): # Cell id of (x, y) in the flat buffer
+        return x * self.cols + y
+
+    def coords(self, index): # Inverse of index(): cell id back to (x, y)
+        return divmod(index, self.cols)
+
+    def __getstate__(self): # Compact pickled form (e.g. when handing the map to worker processes): zlib-compressed wall and cost buffers
+        packed_costs = None if self.costs is None else zlib.compress(self.costs, 1)
+        return self.rows, self.cols, zlib.compress(self.cells, 1), packed_costs, self.diagonal, self.corner_cutting
+
+    def __setstate__(self, state):
+        self.rows, self.cols, packed, packed_costs, self.diagonal, self.corner_cutting = state
+        self.cells = bytearray(zlib.decompress(packed))
+        self.costs = None if packed_costs is None else bytearray(zlib.decompress(packed_costs))
+        self._components = None
+        self.version = 0
 
     def add_wall(self, x, y, w, h): # (self, 4 parameters of coordination)
-        for i in range(x, min(x + w, self.rows)):
-            for j in range(y, min(y + h, self.cols)):
-                self.grid[i][j] = 1  # Add wall cell as 1 (occupied or obstacled)
+        self._fill(x, y, w, h, 1) # Add wall cell as 1 (occupied or obstacled)
+
+    # Many wall rectangles (x, y, w, h) at once, e.g. a whole map file's. Every rectangle is checked before any is painted, so an
+    # invalid one (not four integers, or a negative coordinate or size) raises ValueError and leaves the grid unchanged. Parts outside
+    # of the map are clipped like add_wall() does; returns how many rectangles lay entirely outside of it.
+    # With NumPy the rectangles are checked and clipped as one array, and when their total area exceeds the map (heavy overlap) they
+    # are painted in one sweep of a 2D difference array: +1 at the top-left and bottom-right corner of each rectangle, -1 at the other
+    # two, and a cell is a wall where the prefix sums in both directions (the number of rectangles covering it) are positive. The cost
+    # is then one pass over the map however much they overlap.
+    def add_walls(self, rects):
+        rects = list(rects)
+        walls = self._wall_array(rects) if np is not None else None
+        if walls is None: # Without NumPy, or to find the invalid rectangle: check, clip and paint one rectangle at a time
+            clipped = [] # (x0, y0, x1, y1) of the part of each rectangle inside the map
+            outside = 0
+            for rect in rects:
+                try:
+                    x, y, w, h = map(operator.index, rect)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid wall {rect}: must be four integers (x, y, w, h).") from None
+                if min(x, y, w, h) < 0:
+                    raise ValueError(f"Invalid wall {rect}: coordinates and size must not be negative.")
+                if x >= self.rows or y >= self.cols:
+                    outside += 1
+                elif w and h:
+                    clipped.append((x, y, w, h))
+            for wall in clipped:
+                self._fill(*wall, 1)
+            return outside
+        x0, y0 = walls[:, 0], walls[:, 1]
+        x1, y1 = np.minimum(x0 + walls[:, 2], self.rows), np.minimum(y0 + walls[:, 3], self.cols) # Clip to the map's boundary
+        outside = int(((x0 >= self.rows) | (y0 >= self.cols)).sum())
+        inside = (x0 < x1) & (y0 < y1)
+        x0, y0, x1, y1 = x0[inside], y0[inside], x1[inside], y1[inside]
+        if not len(x0):
+            return outside
+        self._changed()
+        view = np.frombuffer(self.cells, dtype=np.uint8).reshape(self.rows, self.cols)
+        if int(((x1 - x0) * (y1 - y0)).sum()) <= self.rows * self.cols: # Little overlap: painting each rectangle is cheaper
+            for top, left, bottom, right in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+                view[top:bottom, left:right] = 1
+            return outside
+        coverage = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+        np.add.at(coverage, (x0, y0), 1)
+        np.add.at(coverage, (x0, y1), -1)
+        np.add.at(coverage, (x1, y0), -1)
+        np.add.at(coverage, (x1, y1), 1)
+        np.cumsum(coverage, axis=0, out=coverage)
+        np.cumsum(coverage, axis=1, out=coverage)
+        view[coverage[:-1, :-1] > 0] = 1
+        return outside
+
+    def _wall_array(self, rects): # Rectangles as a (count, 4) int64 array when they are all valid, None otherwise
+        try:
+            walls = np.array(rects)
+        except ValueError: # Rectangles of different lengths
+            return None
+        if walls.ndim != 2 or walls.shape[1] != 4 or walls.dtype.kind not in "iu" or (walls < 0).any():
+            return None
+        return walls.astype(np.int64, copy=False)
+
+    def _changed(self): # Walls, costs or neighbourhood changed: components may have split or merged and cached searches are stale
+        self._components = None
+        self.version += 1
+
+    def remove_wall(self, x, y, w, h): # Same rectangle as add_wall(), made empty again
+        self._fill(x, y, w, h, 0)
+
+    def _fill(self, x, y, w, h, value): # Set every cell of the rectangle to value
+        x0, x1 = max(x, 0), min(x + w, self.rows) # Clip the rectangle to the map's boundary
+        y0, y1 = max(y, 0), min(y + h, self.cols)
+        if x0 >= x1 or y0 >= y1:
+            return # Rectangle lies completely outside of the map
+        self._changed()
+        if np is not None: # Paint the whole rectangle at once through a 2D view of the buffer
+            np.frombuffer(self.cells, dtype=np.uint8).reshape(self.rows, self.cols)[x0:x1, y0:y1] = value
+        else: # Paint one contiguous row slice at a time
+            span = bytes([value]) * (y1 - y0)
+            for i in range(x0, x1):
+                self.cells[i * self.cols + y0:i * self.cols + y1] = span
+
+    def add_cost(self, x, y, w, h, cost): # Moving into any cell of the rectangle costs cost (an integer from 1 to 255) instead of 1
+        if not isinstance(cost, int) or not 1 <= cost <= 255:
+            raise ValueError(f"Invalid traversal cost {cost}: must be an integer from 1 to 255.")
+        x0, x1 = max(x, 0), min(x + w, self.rows) # Clip the rectangle to the map's boundary
+        y0, y1 = max(y, 0), min(y + h, self.cols)
+        if x0 >= x1 or y0 >= y1:
+            return # Rectangle lies completely outside of the map
+        self._changed()
+        if self.costs is None:
+            self.costs = bytearray(b'\x01') * (self.rows * self.cols)
+        span = bytes([cost]) * (y1 - y0)
+        for i in range(x0, x1):
+            self.costs[i * self.cols + y0:i * self.cols + y1] = span
+
+    def cost(self, x, y): # Cost of moving into (x, y)
+        return 1 if self.costs is None else self.costs[x * self.cols + y]
+
+    def uniform(self): # Whether every move costs 1 (no terrain costs and no diagonal moves)
+        return self.costs is None and not self.diagonal
+
+    def step_cost(self, current, child): # Cost of the move between two neighbouring cell ids: the cost of child, times sqrt(2) diagonally
+        cost = 1 if self.costs is None else self.costs[child]
+        if self.diagonal and current // self.cols != child // self.cols and current % self.cols != child % self.cols:
+            return cost * SQRT2
+        return cost
+
+    # Connected components of the empty cells, as a flat array of labels indexed by cell id (-1 for walls): two empty cells have the
+    # same label exactly when one can be reached from the other. Computed on first use and cached until the walls or the neighbourhood
+    # change (add_wall(), remove_wall(), set_moves(); code writing to cells directly must call _changed() itself). Labelling works on
+    # runs of empty cells along each row rather than cell by cell: runs in neighbouring rows that share a column are merged with
+    # union-find. A diagonal move is only allowed past at most one wall unless corner cutting is "always", so it then joins cells
+    # that a straight detour joins too; only with "always" do runs touching at a corner also connect.
+    def components(self):
+        if self._components is None:
+            self._components = self._label_components()
+        return self._components
+
+    def _label_components(self):
+        cells, cols = self.cells, self.cols
+        touch = 1 if self.diagonal and self.corner_cutting == "always" else 0
+        parent = [] # Union-find forest over run numbers
+        runs = [] # (first cell id, end cell id, run number) of every run
+        previous = [] # (first y, end y, run number) of the runs in the previous row
+
+        def find(run):
+            while parent[run] != run:
+                parent[run] = parent[parent[run]] # Path halving
+                run = parent[run]
+            return run
+
+        for x in range(self.rows):
+            row = bytes(cells[x * cols:(x + 1) * cols])
+            current = []
+            y = row.find(0)
+            while y != -1:
+                end = row.find(1, y)
+                if end == -1:
+                    end = cols
+                run = len(parent)
+                parent.append(run)
+                current.append((y, end, run))
+                runs.append((x * cols + y, x * cols + end, run))
+                y = row.find(0, end)
+            first = 0
+            for y, end, run in current: # Both rows' runs are sorted by y, so one sweep finds every overlap
+                while first < len(previous) and previous[first][1] + touch <= y:
+                    first += 1
+                other = first
+                while other < len(previous) and previous[other][0] < end + touch:
+                    root, other_root = find(run), find(previous[other][2])
+                    if root != other_root:
+                        parent[max(root, other_root)] = min(root, other_root)
+                    other += 1
+            previous = current
+        labels = array('i', [-1]) * (self.rows * cols)
+        for begin, end, run in runs:
+            labels[begin:end] = array('i', [find(run)]) * (end - begin)
+        return labels
+
+    def reachable(self, start, goal): # False when no goal can be reached from start, answered from the component labels
+        if not self.is_valid(*start):
+            return True # A start outside of the map or on a wall is left to the searches' own rules
+        labels = self.components()
+        label = labels[start[0] * self.cols + start[1]]
+        return any(self.in_bounds(*position) and labels[self.index(*position)] == label for position in goal_set(goal))
+
+    def in_bounds(self, x, y): # Within the map's boundary, regardless of walls
+        return 0 <= x < self.rows and 0 <= y < self.cols
+
+    def neighbours(self, index): # Cell ids of the empty cells one move away from cell id, in Up-Left-Down-Right order (then diagonals)
+        cells, cols = self.cells, self.cols
+        x, y = divmod(index, cols)
+        result = []
+        if y > 0 and not cells[index - 1]: # Up
+            result.append(index - 1)
+        if x > 0 and not cells[index - cols]: # Left
+            result.append(index - cols)
+        if y < cols - 1 and not cells[index + 1]: # Down
+            result.append(index + 1)
+        if x < self.rows - 1 and not cells[index + cols]: # Right
+            result.append(index + cols)
+        if self.diagonal:
+            allowed = CORNER_RULES.index(self.corner_cutting) # Walls allowed beside a diagonal move
+            for dx, dy in DIAGONAL_MOVES: # Up-Left, Down-Left, Down-Right, Up-Right
+                next_x, next_y = x + dx, y + dy
+                if 0 <= next_x < self.rows and 0 <= next_y < cols and not cells[next_x * cols + next_y]:
+                    if cells[x * cols + next_y] + cells[next_x * cols + y] <= allowed: # The two cells the move passes between
+                        result.append(next_x * cols + next_y)
+        return result
+
+    def adjacent(self, x, y): # (x, y) of the empty cells one move away from (x, y), in the same order as neighbours()
+        if not self.in_bounds(x, y): # Only moves back into the map are possible
+            return [(x + dx, y + dy) for dx, dy in STRAIGHT_MOVES if self.is_valid(x + dx, y + dy)]
+        return [divmod(child, self.cols) for child in self.neighbours(x * self.cols + y)]
+
+    def is_wall(self, x, y): # Wall check for an in-bound cell
+        return self.cells[x * self.cols + y] == 1
 
     def is_valid(self, x, y): # Valid moves at empty cell and within the map's boundary
-        return 0 <= x < self.rows and 0 <= y < self.cols and self.grid[x][y] != 1
+        return 0 <= x < self.rows and 0 <= y < self.cols and not self.cells[x * self.cols + y]
 
 class Node:
+    __slots__ = ("x", "y", "parent", "path_cost") # No per-instance __dict__: GBFS and CUS2 allocate one node per push
+
     def __init__(self, x, y, parent=None, path_cost=0):
         self.x = x
         self.y = y
         self.parent = parent
         self.path_cost = path_cost
-        self.depth = 0
 
     # If sum of x and y should be prioritized
     def __lt__(self, other):
@@ -37,186 +290,1024 @@ class Node:
         if isinstance(other, Node): # Check whehter 'other' is an instance of class 'Node
             return self.x == other.x and self.y == other.y
         return False
-    
-def reconstruct_path(node): # Reconstruct to the previous node from the tree diagram, backtracking invalid path
+
+    def __hash__(self): # Consistent with __eq__, so nodes can be kept in sets and dictionaries
+        return hash((self.x, self.y))
+
+def reconstruct_path(node, parent=None, grid=None): # Reconstruct to the previous node from the tree diagram, backtracking invalid path
     path = []
+    if parent is not None: # Parent array keyed by cell id: node is the goal's cell id, the start cell is its own parent
+        while True:
+            path.append(Node(*grid.coords(node)))
+            if parent[node] == node:
+                return path[::-1]
+            node = parent[node] # step back to parent cell
     while node:
         path.append(node)
         node = node.parent # append back to parent node
     return path[::-1]
 
+# Every search accepts either a single (x, y) goal or a collection of goals and stops at the first goal it reaches
+def goal_set(goal): # Goal(s) as a set of coordinates, for O(1) goal tests
+    if len(goal) == 2 and all(isinstance(value, int) for value in goal):
+        return {tuple(goal)}
+    return set(goal)
+
+def goal_ids(grid, goal): # Goal(s) as a set of cell ids, ignoring goals outside of the map
+    return {grid.index(*position) for position in goal_set(goal) if grid.in_bounds(*position)}
+
+def goal_heuristic(heuristic, goal): # h(n) towards the nearest goal: minimum of heuristic(n, goal) over all goals (still admissible and consistent)
+    goals = list(goal_set(goal))
+    if len(goals) == 1:
+        only = goals[0]
+        return lambda current: heuristic(current, only)
+    return lambda current: min(heuristic(current, position) for position in goals)
+
+# Every search also takes on_expand: when given, each expanded cell (x, y) is passed to it as it happens instead of being collected,
+# and the search returns None in place of the traversed list. Collecting into a list (the default) is just one such consumer.
+class ExpansionCounter: # Only counts expansions
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, position):
+        self.count += 1
+
+class ExpansionWriter: # Writes one "x y" line per expansion to an open text file
+    def __init__(self, file):
+        self.file = file
+
+    def __call__(self, position):
+        self.file.write(f"{position[0]} {position[1]}\n")
+
+class _SearchStopped(Exception): # Raised inside a search whose expansions are no longer wanted
+    pass
+
+# Generator over the expansions of search(*args, **kwargs) as they happen. The search runs in a worker thread and hands expansions
+# over in chunks through a bounded queue, so memory stays bounded however long it runs; the generator's return value (StopIteration
+# value, or "yield from" result) is the search's (path, total_nodes, None). Closing the generator early stops the search.
+def iter_expansions(search, *args, chunk_size=1024, **kwargs):
+    chunks = queue.Queue(maxsize=4)
+    stopped = threading.Event()
+    finished = object() # End-of-search marker
+    outcome = {}
+    chunk = []
+
+    def on_expand(position):
+        chunk.append(position)
+        if len(chunk) >= chunk_size:
+            if stopped.is_set():
+                raise _SearchStopped
+            chunks.put(chunk[:])
+            chunk.clear()
+
+    def run():
+        try:
+            outcome["result"] = search(*args, on_expand=on_expand, **kwargs)
+        except _SearchStopped:
+            pass
+        except BaseException as error: # Re-raised in the consumer
+            outcome["error"] = error
+        finally:
+            if chunk and not stopped.is_set():
+                chunks.put(chunk[:])
+            chunks.put(finished)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            items = chunks.get()
+            if items is finished:
+                break
+            yield from items
+    finally:
+        stopped.set()
+        while worker.is_alive(): # Unblock a worker waiting on the full queue so it can notice the stop
+            try:
+                chunks.get(timeout=0.05)
+            except queue.Empty:
+                pass
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
 # Uninformed approaches
-def depth_first_search(grid, start, goal): # LIFO approach
-    stack = [(Node(start[0], start[1]), [])]  # Stack (path history)
-    visited = set()
+# A cell can be pushed again (from another parent) until it is expanded, so every push is an entry of its own. Entries live in flat
+# arrays (struct of arrays: cell coordinates and the entry each was pushed from) instead of a node object and a copy of the whole path
+# per push; the stack holds entry numbers and the path is rebuilt once, by following parent entries back from the goal.
+def depth_first_search(grid, start, goal, on_expand=None): # LIFO approach
+    entry_x, entry_y = array('i', [start[0]]), array('i', [start[1]]) # Cell of each entry
+    entry_parent = array('i', [-1]) # Entry that pushed each entry (-1 for the start)
+    stack = array('i', [0])  # Stack of entry numbers
+    goals = goal_set(goal)
+    cols = grid.cols
+    visited = bytearray(grid.rows * cols) # Expanded cells by cell id
     total_nodes = 0 # number of nodes expanded during search
-    traversed = [] # nodes explored when attempting searching algorithm
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
 
     # Evaluates nodes based on depth of the path and explores deeper levels before branching out.
     while stack:
-        current, path = stack.pop() # popping a tuple (current, path) from the stack, retrieves both the current node and the path leading to it.
+        entry = stack.pop()
+        x, y = entry_x[entry], entry_y[entry]
         total_nodes += 1 
-        traversed.append((current.x, current.y))  # Add current node to traversed list
-        if (current.x, current.y) == goal:
-            return path + [current], total_nodes, traversed  # Return current path (with goal node), and explored
-        visited.add((current.x, current.y)) # Add visited node, avoid duplication
-        unvisited_neighbors = []
-        for dx, dy in [(0, -1), (-1, 0), (0, 1), (1, 0)]:  # Up, Left, Down, Right
-            next_x, next_y = current.x + dx, current.y + dy # attempt moves in Up-Left-Down-Right
-            if grid.is_valid(next_x, next_y) and (next_x, next_y) not in visited: # Check valid next cell and visited state
-                child_node = Node(next_x, next_y, current, current.path_cost + 1) # Create Node object child_node with neighboring, current node, and calculates the cost of reaching the new node from the start node.
-                unvisited_neighbors.append((child_node, path + [current]))  # Append the current node to the path
-        stack.extend(unvisited_neighbors[::-1])  # Add unvisited neighbors in reverse order 
+        expand((x, y))  # Add current node to traversed list (or stream it)
+        if (x, y) in goals:
+            path = []
+            while entry != -1: # Back to the start through the entries that pushed each other
+                path.append(Node(entry_x[entry], entry_y[entry]))
+                entry = entry_parent[entry]
+            return path[::-1], total_nodes, traversed  # Return current path (with goal node), and explored
+        if grid.in_bounds(x, y):
+            visited[x * cols + y] = 1 # Add visited node, avoid duplication
+        unvisited_neighbors = [(next_x, next_y) for next_x, next_y in grid.adjacent(x, y) if not visited[next_x * cols + next_y]]  # Up, Left, Down, Right (then diagonals)
+        for next_x, next_y in reversed(unvisited_neighbors): # Add unvisited neighbors in reverse order
+            stack.append(len(entry_x))
+            entry_x.append(next_x)
+            entry_y.append(next_y)
+            entry_parent.append(entry)
     return None, total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
 
-def breadth_first_search(grid, start, goal, max_iterations=None): # FIFO approach
-    queue = deque([[Node(start[0], start[1])]])  # Queue of paths
-    visited = set()
+def breadth_first_search(grid, start, goal, max_iterations=None, on_expand=None): # FIFO approach
     total_nodes = 0 # number of nodes expanded during search
-    traversed = [] # nodes explored when attempting searching algorithm
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    if not grid.in_bounds(*start):
+        return None, total_nodes, traversed
+    start_id = grid.index(*start)
+    goals = goal_ids(grid, goal)
+    # Parent cell id of every reached cell (-1 while unreached), which doubles as the visited set. Paths are only rebuilt once at the goal.
+    parent = array('i', [-1]) * (grid.rows * grid.cols)
+    parent[start_id] = start_id
+    if max_iterations is not None:
+        depth = array('i', [0]) * (grid.rows * grid.cols) # Path length - 1 of every reached cell, only kept when the path length is bounded
+    queue = deque([start_id])  # Queue of cell ids
+    cols = grid.cols
 
     # Evaluates nodes based on breadth of the search tree, exploring all neighbors before moving to the next level.
     while queue:
-        path = queue.popleft()
+        current = queue.popleft()
         total_nodes += 1
-        current = path[-1]  # Last node in the path
-        traversed.append((current.x, current.y))  # Add current node to traversed list
-        if (current.x, current.y) == goal:
-            return path, total_nodes, traversed  # Return path (with goal node), and explored
-        if max_iterations is not None and len(path) >= max_iterations:
+        expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+        if current in goals:
+            return reconstruct_path(current, parent, grid), total_nodes, traversed  # Return path (with goal node), and explored
+        if max_iterations is not None and depth[current] + 1 >= max_iterations:
             continue
-        visited.add((current.x, current.y)) # Add visited node, avoid duplication
-        for dx, dy in [(0, -1), (-1, 0), (0, 1), (1, 0)]:  # Up, Left, Down, Right
-            next_x, next_y = current.x + dx, current.y + dy # attempt moves in Up-Left-Down-Right
-            if (next_x, next_y) not in visited and grid.is_valid(next_x, next_y): # Check valid next cell and visited state
-                child_node = Node(next_x, next_y) # Create Node object child_node with neighboring node.
-                queue.append(path + [child_node])  # Append the new node to the path
-                visited.add((next_x, next_y)) # Add visited node
+        for child in grid.neighbours(current):  # Up, Left, Down, Right
+            if parent[child] == -1: # Check visited state
+                parent[child] = current # Record the parent instead of copying the whole path
+                if max_iterations is not None:
+                    depth[child] = depth[current] + 1
+                queue.append(child)
+    return None, total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
+
+# Uniform-cost search (Dijkstra): expands cells in order of the cheapest path cost g(n) from the start, so the first goal expanded is
+# reached at the lowest total terrain cost. Move costs are small integers (1 to 255), so the open list is a bucket queue (Dial's
+# algorithm) instead of a heap: a ring of max cost + 1 FIFO buckets where the bucket g % len(ring) holds the cells pushed with cost g.
+# Every push and pop is O(1), and with every move costing 1 the expansion order is exactly BFS's.
+def uniform_cost_search(grid, start, goal, on_expand=None):
+    if grid.diagonal: # Diagonal moves cost multiples of sqrt(2), which whole-number buckets cannot hold: Dijkstra on a heap (A* with h = 0)
+        return a_star_search(grid, start, goal, lambda current, goal: 0, on_expand=on_expand)
+    total_nodes = 0 # number of nodes expanded during search
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    if not grid.in_bounds(*start):
+        return None, total_nodes, traversed
+    cols, size, costs = grid.cols, grid.rows * grid.cols, grid.costs
+    start_id = grid.index(*start)
+    goals = goal_ids(grid, goal)
+    g_score = array('q', [-1]) * size # Cheapest known cost from start to each cell id (-1 while unreached)
+    parent = array('i', [-1]) * size # Parent cell id on the cheapest known path
+    closed = bytearray(size) # Expanded cells
+    g_score[start_id] = 0
+    parent[start_id] = start_id
+    buckets = [[] for _ in range((max(costs) if costs is not None else 1) + 1)] # A move never reaches past the next len(buckets) - 1 costs
+    buckets[0].append(start_id)
+    pending = 1 # Entries left in all buckets, stale ones included
+    g = 0
+    neighbours = grid.neighbours
+
+    while pending:
+        bucket = buckets[g % len(buckets)] # Every move costs at least 1, so nothing is added to this bucket while it is emptied
+        pending -= len(bucket)
+        for current in bucket:
+            if closed[current]:
+                continue # Stale entry: the cell was already expanded at a lower cost
+            closed[current] = 1
+            total_nodes += 1
+            expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+            if current in goals:
+                return reconstruct_path(current, parent, grid), total_nodes, traversed  # Return path (with goal node), and explored
+            for child in neighbours(current):  # Up, Left, Down, Right
+                child_g = g + (1 if costs is None else costs[child])
+                if not closed[child] and (g_score[child] == -1 or child_g < g_score[child]):
+                    g_score[child] = child_g
+                    parent[child] = current
+                    buckets[child_g % len(buckets)].append(child)
+                    pending += 1
+        bucket.clear()
+        g += 1
     return None, total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
 
+# Shortest move count from the nearest of the source cells to every cell (-1 where unreachable), as a flat int32 array indexed by cell
+# id. With parents=True it returns (distance, parent) instead, where parent holds, for every reached cell but the sources, the index in
+# STRAIGHT_MOVES + DIAGONAL_MOVES of the move towards a cell one step closer to a source (the first such move in neighbour order),
+# and -1 elsewhere; field_path() follows it back to a source.
+# The BFS runs one layer at a time. With NumPy, a wide layer is expanded as whole arrays: for each move, the cells of the frontier
+# that can make it (a precomputed mask per move: both cells empty, inside the map, corner rule respected) are shifted by the move's
+# id offset and masked against the cells already reached. A narrow layer (corridors, mazes) is cheaper cell by cell in Python, where
+# the per-call overhead of a dozen array operations is not worth it; both write into the same buffer.
+SPARSE_FRONTIER = 64 # Layers with fewer cells are expanded in Python
+
+def distance_field(grid, sources, parents=False):
+    distance = array('i', [-1]) * (grid.rows * grid.cols)
+    frontier = [grid.index(*source) for source in sources if grid.is_valid(*source)]
+    for cell in frontier:
+        distance[cell] = 0
+    moves = grid_moves(grid) if np is not None else None # [(id offset, mask of the cells that can make the move)]
+    view = np.frombuffer(distance, dtype=np.int32) if np is not None else None
+    neighbours = grid.neighbours
+    steps = 0
+    while len(frontier): # One BFS layer at a time
+        steps += 1
+        if moves is None or len(frontier) < SPARSE_FRONTIER:
+            next_frontier = []
+            for current in (frontier.tolist() if np is not None and isinstance(frontier, np.ndarray) else frontier):
+                for child in neighbours(current):
+                    if distance[child] == -1:
+                        distance[child] = steps
+                        next_frontier.append(child)
+        else:
+            frontier = np.asarray(frontier, dtype=np.intp)
+            layer = []
+            for offset, can_move in moves:
+                children = frontier[can_move[frontier]] + offset
+                children = children[view[children] == -1] # Each child at most once per move; earlier moves' children are already marked
+                view[children] = steps
+                layer.append(children)
+            next_frontier = np.concatenate(layer)
+        frontier = next_frontier
+    if not parents:
+        return distance
+    return distance, field_parents(grid, distance, moves)
+
+def grid_moves(grid): # (cell id offset, flat bool mask of the cells that can make the move) per move, in neighbour order
+    rows, cols = grid.rows, grid.cols
+    empty = np.frombuffer(grid.cells, dtype=np.uint8).reshape(rows, cols) == 0
+    allowed = CORNER_RULES.index(grid.corner_cutting)
+    moves = []
+    for dx, dy in STRAIGHT_MOVES + (DIAGONAL_MOVES if grid.diagonal else []):
+        can_move = np.zeros((rows, cols), dtype=bool)
+        here = (slice(max(-dx, 0), rows - max(dx, 0)), slice(max(-dy, 0), cols - max(dy, 0))) # Cells whose move stays inside the map
+        there = (slice(max(dx, 0), rows - max(-dx, 0)), slice(max(dy, 0), cols - max(-dy, 0)))
+        mask = empty[here] & empty[there]
+        if dx and dy: # The two cells the move passes between: (x, y + dy) and (x + dx, y)
+            beside = (~empty[here[0], there[1]]).astype(np.uint8) + ~empty[there[0], here[1]]
+            mask &= beside <= allowed
+        can_move[here] = mask
+        moves.append((dx * cols + dy, can_move.ravel()))
+    return moves
+
+def field_parents(grid, distance, moves=None): # Move towards the source for every reached cell of a distance field (see distance_field())
+    parent = array('b', [-1]) * len(distance)
+    if moves is not None: # Whole arrays, last move first so that the first matching move in neighbour order is the one kept
+        view, parent_view = np.frombuffer(distance, dtype=np.int32), np.frombuffer(parent, dtype=np.int8)
+        for number in reversed(range(len(moves))):
+            offset, can_move = moves[number]
+            cells = np.flatnonzero(can_move & (view > 0))
+            cells = cells[view[cells + offset] == view[cells] - 1]
+            parent_view[cells] = number
+        return parent
+    moves = STRAIGHT_MOVES + DIAGONAL_MOVES
+    for cell, steps in enumerate(distance):
+        if steps > 0:
+            closer = next(child for child in grid.neighbours(cell) if distance[child] == steps - 1) # Moves are symmetric
+            (x, y), (next_x, next_y) = grid.coords(cell), grid.coords(closer)
+            parent[cell] = moves.index((next_x - x, next_y - y))
+    return parent
+
+def field_path(grid, distance, parent, position): # Path (list of nodes) from the nearest source of a distance field to position, or None
+    x, y = position
+    if not grid.in_bounds(x, y) or distance[x * grid.cols + y] == -1:
+        return None
+    moves = STRAIGHT_MOVES + DIAGONAL_MOVES
+    path = [Node(x, y)]
+    while parent[x * grid.cols + y] != -1:
+        dx, dy = moves[parent[x * grid.cols + y]]
+        x, y = x + dx, y + dy
+        path.append(Node(x, y))
+    return path[::-1]
+
 # 1st Custom method: Inspired by the depth_limited method, integrating the combination of DFS and BFS approaches.
 # References of the depth_limited method can be found at: https://ai-master.gitbooks.io/classic-search/content/what-is-depth-limited-search.html
-def custom_search_1(grid, start, goal):
-    depth_limit = 0
+def custom_search_1(grid, start, goal, on_expand=None):
+    return iterative_deepening_search(grid, start, goal, on_expand=on_expand) # Depth-limited DFS with limits 0, 1, 2, ... until a goal is reached
 
-    while True:
-        result, total_nodes, traversed = depth_limited_search(grid, start, goal, depth_limit)
-        if result:
-            return result, total_nodes, traversed
-        depth_limit += 1
-
-# The method combine the features of DFS and BFS altogether.
-def depth_limited_search(grid, start, goal, depth_limit):
-    stack = [(Node(start[0], start[1]), [])]  # Stack (path history)
-    visited = set()
-    total_nodes = 0 # number of nodes expanded during search
-    traversed = [] # nodes explored when attempting searching algorithm
+# Iterative deepening A* (IDA*): the same engine bounded by f(n) = g(n) + h(n) instead of the depth alone
+def iterative_deepening_a_star_search(grid, start, goal, heuristic, on_expand=None):
+    return iterative_deepening_search(grid, start, goal, heuristic, on_expand)
 
-    while stack:
-        current, path = stack.pop()
+# Iterative deepening engine shared by CUS1 (bound on depth) and IDA* (bound on f = g + h). Each iteration is a DFS driven by an
+# explicit stack of cell ids, the next move to try at every level, and a depth array that lets a cell be entered again only when it is
+# reached at a shallower depth than before in the same iteration. Nothing is allocated per node: the arrays are reused by every
+# iteration (stamp tells which iteration last wrote a cell's depth), and the path is read off the stack once a goal is reached.
+# Bounds only grow, so every route of the previous iteration is still allowed; routes deeper than the depth it recorded are skipped,
+# which keeps each iteration close to one entry per cell instead of repeatedly improving cells first reached along long detours.
+# CUS1's depth is the number of moves; IDA*'s is the path cost g (terrain costs, sqrt(2) per diagonal move), the same as A*'s.
+# total_nodes counts every iteration's expansions and on_expand receives them all, but traversed only holds the last iteration's (the
+# search that reached the goal, which is what the GUI replays, one cell at a time).
+def iterative_deepening_search(grid, start, goal, heuristic=None, on_expand=None):
+    total_nodes = 0 # number of nodes expanded during search, over all iterations
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    if not grid.in_bounds(*start):
+        return None, total_nodes, traversed
+    cells, cols = grid.cells, grid.cols
+    size = grid.rows * cols
+    goals = goal_ids(grid, goal)
+    start_id = grid.index(*start)
+    h_goal = goal_heuristic(heuristic, goal) if heuristic else None
+    stamp = array('i', [-2]) * size # Iteration that last wrote depth[] of each cell (-2: never, so not mistaken for the iteration before 0)
+    depth = array('d', [0]) * size # Shallowest depth each cell was entered at in that iteration
+    stack = array('i') # Cell ids on the current DFS path, one per level
+    stack_depth = array('d') # Depth of the cell at each level (the level itself when every move counts 1)
+    next_move = bytearray() # Next of the moves (Up, Left, Down, Right, then Up-Left, Down-Left, Down-Right, Up-Right) to try at each level
+    moves = 8 if grid.diagonal else 4
+    allowed = CORNER_RULES.index(grid.corner_cutting) # Walls allowed beside a diagonal move
+    weighted = h_goal is not None and not grid.uniform() # Whether IDA* has to add up real move costs
+    step_cost = grid.step_cost
+    bound = h_goal(start) if h_goal else 0
+    iteration = 0
+
+    while True:
+        while len(stack) <= bound + 1: # Deepest level this iteration can reach is bound (h(n) >= 0, and no move costs less than 1)
+            stack.append(0)
+            stack_depth.append(0)
+            next_move.append(0)
+        next_bound = float('inf') # Smallest f(n) that exceeded the bound, the bound of the next iteration
+        if traversed is not None:
+            traversed.clear() # Keep only this iteration's expansions
+        stamp[start_id], depth[start_id] = iteration, 0
+        stack[0], stack_depth[0], next_move[0] = start_id, 0, 0
+        level = 0
         total_nodes += 1
-        traversed.append((current.x, current.y))  # Add current node to traversed list
-        if (current.x, current.y) == goal:
-            return path + [current], total_nodes, traversed  # Return the current path (with goal node), and explored 
-        # Evaluates nodes based on depth limit. If it reaches the depth limit, it will stop. Otherwise, keep going deeper.
-        if current.depth < depth_limit:
-            visited.add((current.x, current.y)) # Add visited node, avoid duplication
-            unvisited_neighbors = [] # set list of unvisited neighboring cells
-            for dx, dy in [(0, -1), (-1, 0), (0, 1), (1, 0)]:  # Up, Left, Down, Right
-                next_x, next_y = current.x + dx, current.y + dy # attempt moves in Up-Left-Down-Right
-                if grid.is_valid(next_x, next_y) and (next_x, next_y) not in visited: # Check valid next cell and visited state
-                    child_node = Node(next_x, next_y, current, current.path_cost + 1) # Create Node object child_node with neighboring, current node, and calculates the cost of reaching the new node from the start node.
-                    unvisited_neighbors.append((child_node, path + [current]))  # Append the current node to the path
-            stack.extend(unvisited_neighbors[::-1])  # Add unvisited neighbors in reverse order 
-    return None, total_nodes, traversed # Return an empty path, total number of nodes explored and traversed if no path is found
+        expand(start)
+        if start_id in goals:
+            return [Node(*start)], total_nodes, traversed
+        while level >= 0:
+            current, move = stack[level], next_move[level]
+            if move == moves: # All moves tried, backtrack
+                level -= 1
+                continue
+            next_move[level] = move + 1
+            if move == 0: # Up
+                if current % cols == 0:
+                    continue
+                child = current - 1
+            elif move == 1: # Left
+                if current < cols:
+                    continue
+                child = current - cols
+            elif move == 2: # Down
+                if current % cols == cols - 1:
+                    continue
+                child = current + 1
+            elif move == 3: # Right
+                if current >= size - cols:
+                    continue
+                child = current + cols
+            else: # Diagonal move
+                dx, dy = DIAGONAL_MOVES[move - 4]
+                x, y = divmod(current, cols)
+                if not (0 <= x + dx < grid.rows and 0 <= y + dy < cols):
+                    continue
+                child = current + dx * cols + dy
+                if cells[current + dy] + cells[current + dx * cols] > allowed:
+                    continue # Cuts a corner the rule forbids
+            child_depth = stack_depth[level] + step_cost(current, child) if weighted else level + 1
+            if cells[child]:
+                continue # Wall
+            if stamp[child] == iteration and depth[child] <= child_depth:
+                continue # Already entered at the same or a shallower depth in this iteration
+            if stamp[child] == iteration - 1 and depth[child] < child_depth:
+                continue # The previous iteration reached it shallower, and that route is still within this iteration's bound
+            f = child_depth + h_goal(divmod(child, cols)) if h_goal else child_depth
+            if f > bound:
+                if f < next_bound:
+                    next_bound = f
+                continue
+            stamp[child], depth[child] = iteration, child_depth
+            level += 1
+            stack[level], stack_depth[level], next_move[level] = child, child_depth, 0
+            total_nodes += 1
+            expand(divmod(child, cols))  # Add current node to traversed list (or stream it)
+            if child in goals:
+                return [Node(*grid.coords(cell)) for cell in stack[:level + 1]], total_nodes, traversed
+        if next_bound == float('inf'):
+            return None, total_nodes, traversed # Nothing was cut off by the bound: the whole reachable region holds no goal
+        # Without diagonal moves path costs are whole numbers, so fractional bounds (e.g. Euclidean h) can be rounded up
+        bound = next_bound if grid.diagonal and weighted else math.ceil(next_bound)
+        iteration += 1
 
 # Informed approaches
-def greedy_best_first_search(grid, start, goal, heuristic):
-    priority_queue = [(heuristic(start, goal), Node(start[0], start[1]))]
+def greedy_best_first_search(grid, start, goal, heuristic, on_expand=None):
+    goals = goal_set(goal)
+    h = goal_heuristic(heuristic, goals) # h(n) towards the nearest goal
+    priority_queue = [(h(start), Node(start[0], start[1]))]
     heapq.heapify(priority_queue)
-    visited = set()
+    cols = grid.cols
+    visited = bytearray(grid.rows * cols) # Pushed or expanded cells by cell id
     total_nodes = 0 # number of nodes expanded during search
-    traversed = [] # nodes explored when attempting searching algorithm
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
 
     # Expands nodes in the order of the heuristic values. Use only the cost to reach the goal from the current node to evaluate the node
     while priority_queue:
         _, current = heapq.heappop(priority_queue)
         total_nodes += 1
-        traversed.append((current.x, current.y))  # Add current node to traversed list
-        if (current.x, current.y) == goal:
+        expand((current.x, current.y))  # Add current node to traversed list (or stream it)
+        if (current.x, current.y) in goals:
             return reconstruct_path(current), total_nodes, traversed # Reconstruct path (with goal nodes), and exlored
-        visited.add((current.x, current.y)) # Add visited node, avoid duplication
-        for dx, dy in [(0, -1), (-1, 0), (0, 1), (1, 0)]:  # Up, Left, Down, Right
-            next_x, next_y = current.x + dx, current.y + dy # attempt moves in Up-Left-Down-Right
-            if (next_x, next_y) not in visited and grid.is_valid(next_x, next_y): # Check valid next cell and visited state
+        if grid.in_bounds(current.x, current.y):
+            visited[current.x * cols + current.y] = 1 # Add visited node, avoid duplication
+        for next_x, next_y in grid.adjacent(current.x, current.y):  # Up, Left, Down, Right (then the diagonal moves on an 8-connected grid)
+            if not visited[next_x * cols + next_y]: # Check visited state
                 # Push the node to the priority queue with the heuristic value (h(n)) and the node information
-                heapq.heappush(priority_queue, (heuristic((next_x, next_y), goal), Node(next_x, next_y, current)))
-                visited.add((next_x, next_y))
+                heapq.heappush(priority_queue, (h((next_x, next_y)), Node(next_x, next_y, current)))
+                visited[next_x * cols + next_y] = 1
     return [], total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
 
-def a_star_search(grid, start, goal, heuristic):
-    priority_queue = [(0, heuristic(start, goal), Node(start[0], start[1]))]
-    heapq.heapify(priority_queue)
-    visited = set()
+# Per-cell arrays of one A* search, kept for the grid and reused by its later searches: a query that expands a handful of cells on a
+# huge map (batch.py answers many on one loaded grid) would otherwise spend most of its time allocating and filling them. Instead of
+# clearing them, each search takes a new even mark: a cell whose state is below the mark was not reached by this search (its g_score
+# and parent are left over from an earlier one), mark means reached and mark + 1 expanded.
+class AStarScratch:
+    __slots__ = ("g_score", "parent", "state", "mark")
+
+    def __init__(self, size):
+        self.g_score = array('d', [0]) * size # Cheapest known cost from start to each cell id
+        self.parent = array('i', [-1]) * size # Parent cell id on the cheapest known path
+        self.state = array('H', [0]) * size # Mark of the search that last reached each cell, + 1 once it expanded it
+        self.mark = 0
+
+    def next_mark(self):
+        self.mark += 2
+        if self.mark > 0xfffe: # Out of 16-bit marks (every 32767 searches): clear the states in place, a block at a time, and start over
+            state, block = self.state, array('H', [0]) * 65536
+            for begin in range(0, len(state), len(block)):
+                state[begin:begin + len(block)] = block[:len(state) - begin]
+            self.mark = 2
+        return self.mark
+
+_a_star_scratch = weakref.WeakKeyDictionary() # Grid -> AStarScratch not in use (one per search running on it at the same time)
+
+# A* over integer cell ids: real g-costs in a flat array, a lazy-deletion binary heap (stale entries are skipped when popped instead of
+# decreasing keys) ordered by f then h, and a closed set. With a consistent heuristic (Manhattan or Euclidean on this 4-connected
+# grid) a closed cell is never improved, so closed neighbours are skipped outright; consistent=False lets improved cells be re-expanded.
+# On weighted terrain g(n) adds up the cost of every cell moved into, times sqrt(2) for diagonal moves; since no move costs less than 1
+# (or sqrt(2) diagonally), Manhattan and Euclidean distance stay consistent on 4-connected grids and octile distance on 8-connected ones.
+# The per-cell arrays are borrowed from the grid's pool (see AStarScratch) and given back when the search ends.
+def a_star_search(grid, start, goal, heuristic, consistent=True, on_expand=None):
+    if not grid.in_bounds(*start):
+        return [], 0, [] if on_expand is None else None
+    pool = _a_star_scratch.setdefault(grid, [])
+    try:
+        scratch = pool.pop() # Atomic: concurrent searches on one grid (batch.py's threads) never share arrays
+    except IndexError:
+        scratch = AStarScratch(grid.rows * grid.cols)
+    try:
+        return _a_star(grid, start, goal, heuristic, consistent, on_expand, scratch)
+    finally:
+        pool.append(scratch)
+
+def _a_star(grid, start, goal, heuristic, consistent, on_expand, scratch):
     total_nodes = 0 # number of nodes expanded during search
-    traversed = [] # nodes explored when attempting searching algorithm
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    cols = grid.cols
+    start_id = grid.index(*start)
+    goals = goal_ids(grid, goal)
+    h_goal = goal_heuristic(heuristic, goal) # h(n) towards the nearest goal
+    mark = scratch.next_mark()
+    closed_mark = mark + 1
+    g_score, parent, state = scratch.g_score, scratch.parent, scratch.state
+    g_score[start_id] = 0
+    parent[start_id] = start_id
+    state[start_id] = mark
+    h = h_goal(start)
+    priority_queue = [(h, h, start_id, 0)] # (f(n) = g(n) + h(n), h(n) as tie-breaker, cell id, g(n) at push time)
+    heappush, heappop, neighbours, step_cost = heapq.heappush, heapq.heappop, grid.neighbours, grid.step_cost # Local aliases for the hot loop
+    uniform = grid.uniform()
 
     # Evaluates nodes based on both cost to reach the node and the heuristic estimate of the cost from current to goal node.
     while priority_queue:
-        _, _, current = heapq.heappop(priority_queue)
+        _, _, current, g = heappop(priority_queue)
+        if g > g_score[current]:
+            continue # Stale entry: a cheaper path to this cell was pushed later
+        state[current] = closed_mark
         total_nodes += 1
-        traversed.append((current.x, current.y))  # Add current node to traversed list
-        if (current.x, current.y) == goal:
-            return reconstruct_path(current), total_nodes, traversed # Reconstruct path (with goal nodes), and explored
-        visited.add((current.x, current.y)) # Add visited node, avoid duplication
-        for dx, dy in [(0, -1), (-1, 0), (0, 1), (1, 0)]:  # Up, Left, Down, Right
-            next_x, next_y = current.x + dx, current.y + dy # attempt moves in Up-Left-Down-Right
-            if (next_x, next_y) not in visited and grid.is_valid(next_x, next_y): # Check valid next cell and visited state
+        expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+        if current in goals:
+            return reconstruct_path(current, parent, grid), total_nodes, traversed # Reconstruct path (with goal nodes), and explored
+        unit_g = g + 1 # Cost of any move on a grid without terrain costs or diagonal moves
+        for child in neighbours(current):  # Up, Left, Down, Right (then diagonals)
+            reached = state[child]
+            if consistent and reached == closed_mark:
+                continue # Already expanded with its optimal cost
+            child_g = unit_g if uniform else g + step_cost(current, child)
+            if reached < mark or child_g < g_score[child]: # First reached by this search, or on a cheaper path
+                if reached < mark:
+                    state[child] = mark
+                g_score[child] = child_g
+                parent[child] = current
+                h = h_goal(divmod(child, cols))
                 # Push the node to the priority queue with the total estimated cost (f(n) = g(n) + h(n))
-                heapq.heappush(priority_queue, (heuristic(start, goal) + heuristic((next_x, next_y), goal), 
-                                                heuristic((next_x, next_y), goal), Node(next_x, next_y, current)))
-                visited.add((next_x, next_y))
+                heappush(priority_queue, (child_g + h, h, child, child_g))
     return [], total_nodes, traversed  # Return an empty path, total nodes explored and traversed if no path is found
 
+# Anytime Repairing A* (ARA*): a first path found quickly with the heuristic inflated by INITIAL_WEIGHT (f(n) = g(n) + w * h(n), a
+# path at most w times the optimal cost), then better ones while time remains, lowering w by WEIGHT_STEP down to 1 (optimal, as A*).
+# g-values and parents are kept from one iteration to the next: a new iteration reorders the open list for the smaller weight, adds
+# back the cells improved after their expansion in the previous one and only re-expands what that changes, instead of starting over.
+# Each finished iteration hands its path to on_improve(path, bound) with a suboptimality bound: min(w, cost / min(g + h) over the
+# cells still open), its cost over a lower bound on the optimum. time_budget (seconds) is a hard limit, checked every TIME_CHECK
+# expansions: the best path found by then is returned, or none when the first iteration did not finish. total_nodes and traversed
+# cover every iteration.
+INITIAL_WEIGHT = 3.0
+WEIGHT_STEP = 0.5
+TIME_CHECK = 256 # Expansions between two readings of the clock
+
+def anytime_a_star_search(grid, start, goal, heuristic, time_budget=None, on_improve=None, on_expand=None):
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    total_nodes = 0 # number of nodes expanded during search, over all iterations
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    if not grid.in_bounds(*start):
+        return [], total_nodes, traversed
+    cols, size = grid.cols, grid.rows * grid.cols
+    start_id = grid.index(*start)
+    goals = goal_ids(grid, goal)
+    h_goal = goal_heuristic(heuristic, goal) # h(n) towards the nearest goal
+    g_score = array('d', [float('inf')]) * size # Cheapest known cost from start to each cell id, kept across iterations
+    parent = array('i', [-1]) * size # Parent cell id on the cheapest known path
+    closed = array('i', [-1]) * size # Iteration that last expanded each cell
+    g_score[start_id] = 0
+    parent[start_id] = start_id
+    weight = INITIAL_WEIGHT
+    h = h_goal(start)
+    open_list = [(weight * h, h, start_id, 0)] # (g(n) + w * h(n), h(n) as tie-breaker, cell id, g(n) at push time)
+    inconsistent = set() # Cells improved after their expansion in this iteration: reopened in the next one
+    if start_id in goals: # Already at a goal: the start is expanded, as in every other search, and the path is optimal
+        total_nodes += 1
+        expand(tuple(start))
+        best_path = [Node(*start)]
+        if on_improve is not None:
+            on_improve(best_path, 1.0)
+        return best_path, total_nodes, traversed
+    best_cost, best_goal = float('inf'), None # Cheapest goal reached so far
+    best_path = []
+    heappush, heappop, neighbours, step_cost = heapq.heappush, heapq.heappop, grid.neighbours, grid.step_cost # Local aliases for the hot loop
+    uniform = grid.uniform()
+    iteration = 0
+
+    while True:
+        # Expand until no open cell can lead to a goal cheaper than the best one, as far as the inflated f-values tell
+        while open_list and open_list[0][0] < best_cost:
+            if deadline is not None and not total_nodes % TIME_CHECK and time.perf_counter() >= deadline:
+                return best_path, total_nodes, traversed # Out of time: the last finished iteration's path
+            _, _, current, g = heappop(open_list)
+            if g > g_score[current] or closed[current] == iteration:
+                continue # Stale entry: a cheaper path to this cell was pushed later
+            closed[current] = iteration
+            total_nodes += 1
+            expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+            unit_g = g + 1 # Cost of any move on a grid without terrain costs or diagonal moves
+            for child in neighbours(current):  # Up, Left, Down, Right (then diagonals)
+                child_g = unit_g if uniform else g + step_cost(current, child)
+                if child_g < g_score[child]:
+                    g_score[child] = child_g
+                    parent[child] = current
+                    if child in goals and child_g < best_cost:
+                        best_cost, best_goal = child_g, child
+                    if closed[child] == iteration:
+                        inconsistent.add(child)
+                    else:
+                        h = h_goal(divmod(child, cols))
+                        heappush(open_list, (child_g + weight * h, h, child, child_g))
+        if best_goal is None:
+            return best_path, total_nodes, traversed # Nothing left to expand and no goal reached
+        best_path = reconstruct_path(best_goal, parent, grid)
+        # Cells still open (in the open list, or waiting to be reopened) bound what any cheaper path could cost
+        pending = {cell: h for _, h, cell, g in open_list if g == g_score[cell]}
+        for cell in inconsistent:
+            pending[cell] = h_goal(divmod(cell, cols))
+        lower = min((g_score[cell] + h for cell, h in pending.items()), default=best_cost)
+        bound = min(weight, best_cost / lower) if lower < best_cost else 1.0
+        if on_improve is not None:
+            on_improve(best_path, bound)
+        if bound <= 1:
+            return best_path, total_nodes, traversed # Optimal
+        weight = max(min(weight, bound) - WEIGHT_STEP, 1.0) # Weights above the bound already met could not tighten it
+        iteration += 1
+        open_list = [(g_score[cell] + weight * h, h, cell, g_score[cell]) for cell, h in pending.items()]
+        heapq.heapify(open_list)
+        inconsistent = set()
+
+# Simplified memory-bounded A* (SMA*): A* that keeps at most node_budget search nodes in memory, for maps where A*'s per-cell arrays
+# and open list do not fit. Nodes form a tree from the start; a cell is in memory at most once, on its cheapest known path. When the
+# budget is reached, the worst leaf (highest f, shallowest among equals) is forgotten and its f is backed up into its parent, which
+# goes back into the open list to regenerate it, starting from that f, once it is the lowest again. A node left without successors in
+# memory is worth the lowest f it forgot (inf for a dead end), and that is what its parent records when it is forgotten in turn, so
+# what is known about forgotten subtrees is kept in their ancestors and f-values only grow as the search thrashes. A path that needs
+# more nodes than the budget cannot be held, so nodes that deep are not added (their f is inf). The path is optimal (with a
+# consistent heuristic) whenever an optimal path fits in the budget; otherwise a longer path or none is returned rather than using
+# more memory. traversed grows with every expansion, re-expansions included: on big maps stream expansions to on_expand instead.
+DEFAULT_NODE_BUDGET = 1000000
+
+class BoundedNode: # Search node of memory_bounded_a_star_search(), stored by cell id
+    __slots__ = ("g", "f", "parent", "depth", "children", "forgotten", "expanded")
+
+    def __init__(self, g, f, parent, depth):
+        self.g = g
+        self.f = f # g + h (pathmax) while unexpanded; once expanded, only kept up to date while it has no successors in memory
+        self.parent = parent # Cell id of the parent, None for the start
+        self.depth = depth
+        self.children = [] # Cell ids of the successors in memory
+        self.forgotten = {} # Cell id -> f of the successors forgotten since this node was last expanded
+        self.expanded = False
+
+    def reopened(self): # Priority of an expanded node in the open list: the lowest f among its forgotten successors
+        return min(self.forgotten.values(), default=float('inf'))
+
+def memory_bounded_a_star_search(grid, start, goal, heuristic, node_budget=DEFAULT_NODE_BUDGET, on_expand=None):
+    total_nodes = 0 # number of nodes expanded during search, re-expansions included
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    if not grid.in_bounds(*start) or node_budget < 1:
+        return [], total_nodes, traversed
+    inf = float('inf')
+    cols = grid.cols
+    start_id = grid.index(*start)
+    goals = goal_ids(grid, goal)
+    h_goal = goal_heuristic(heuristic, goal) # h(n) towards the nearest goal
+    nodes = {start_id: BoundedNode(0, h_goal(start), None, 0)}
+    # Lazy heaps: entries no longer matching their node (forgotten, replaced, expanded, f changed) are skipped when popped
+    open_list = [(nodes[start_id].f, 0, start_id)] # (f, -g: deeper first among equals, cell id); expanded nodes enter with reopened()
+    leaves = [] # (-f, g: shallower first among equals, cell id) of nodes without successors in memory
+    heappush, heappop, neighbours, step_cost = heapq.heappush, heapq.heappop, grid.neighbours, grid.step_cost # Local aliases for the hot loop
+
+    def settle(cell, node): # An expanded node lost its last successor in memory: as a leaf, it is worth the lowest f it forgot
+        node.f = node.reopened()
+        heappush(leaves, (-node.f, node.g, cell))
+
+    def detach(cell): # Drop a node and its whole subtree from memory, once a cheaper path to it is found
+        parent_cell = nodes[cell].parent
+        parent = nodes[parent_cell]
+        parent.children.remove(cell)
+        stack = [cell]
+        while stack:
+            stack.extend(nodes.pop(stack.pop()).children)
+        if not parent.children:
+            settle(parent_cell, parent)
+
+    def forget(keep): # Forget the worst leaf other than keep (the node being expanded)
+        while leaves:
+            negative_f, g, cell = heappop(leaves)
+            node = nodes.get(cell)
+            if node is None or node.children or cell == start_id or cell == keep or -negative_f != node.f or g != node.g:
+                continue
+            del nodes[cell]
+            parent = nodes[node.parent]
+            parent.children.remove(cell)
+            if node.f < inf: # Worth regenerating later
+                parent.forgotten[cell] = node.f
+                heappush(open_list, (parent.reopened(), -parent.g, node.parent))
+            if not parent.children:
+                settle(node.parent, parent)
+            return
+
+    def compact(): # Rebuild both heaps from the nodes in memory, dropping their stale entries
+        open_list[:] = [(node.reopened() if node.expanded else node.f, -node.g, cell) for cell, node in nodes.items()
+                        if not node.expanded or node.forgotten]
+        leaves[:] = [(-node.f, node.g, cell) for cell, node in nodes.items() if not node.children]
+        heapq.heapify(open_list)
+        heapq.heapify(leaves)
+
+    while open_list:
+        if len(open_list) + len(leaves) > 4 * len(nodes) + 1024:
+            compact() # Thrashing piles up stale entries: keep the heaps, like the nodes, within the budget
+        priority, negative_g, current = heappop(open_list)
+        node = nodes.get(current)
+        if node is None or -negative_g != node.g or priority != (node.reopened() if node.expanded else node.f):
+            continue # Stale entry
+        if priority == inf:
+            break # Every path left needs more nodes than the budget
+        total_nodes += 1
+        expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+        if current in goals:
+            path = []
+            while current is not None: # Every ancestor of a node in memory is in memory
+                path.append(Node(*grid.coords(current)))
+                current = nodes[current].parent
+            return path[::-1], total_nodes, traversed
+        if node.expanded: # Regenerate the forgotten successors, no lower than the f they had
+            successors = list(node.forgotten.items())
+            node.forgotten = {}
+        else:
+            successors = [(child, priority) for child in neighbours(current)]  # Up, Left, Down, Right (then diagonals)
+            node.expanded = True
+        for child, lowest in successors:
+            child_g = node.g + step_cost(current, child)
+            other = nodes.get(child)
+            if other is not None:
+                if other.g <= child_g:
+                    continue # Already in memory with a path at least as cheap
+                detach(child)
+            depth = node.depth + 1
+            if depth >= node_budget or (depth == node_budget - 1 and child not in goals):
+                continue # A path through it would need more nodes than the budget (its f is inf)
+            if len(nodes) >= node_budget:
+                # There is always a leaf to forget here: if current were the only one, memory would hold just its path from the start,
+                # and the child would be too deep to be added
+                forget(current)
+            f = max(lowest, child_g + h_goal(divmod(child, cols))) # Never below its parent's f (pathmax) or its own earlier f
+            nodes[child] = BoundedNode(child_g, f, current, depth)
+            node.children.append(child)
+            heappush(open_list, (f, -child_g, child))
+            heappush(leaves, (-f, child_g, child))
+        if not node.children:
+            settle(current, node) # Dead end (as far as memory allows) unless successors were forgotten while adding the others
+    return [], total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
+
 # 2nd Custom method: a combination of  Greedy Best First Search and A* search methods
-def custom_search_2(grid, start, goal, heuristic):
+def custom_search_2(grid, start, goal, heuristic, on_expand=None):
     priority_queue = [(0, 0, Node(start[0], start[1]))]  # (total_cost, path_cost, node)
+    goals = goal_set(goal)
+    h = goal_heuristic(heuristic, goals) # h(n) towards the nearest goal
     heapq.heapify(priority_queue)
-    visited = set()
+    cols = grid.cols
+    visited = bytearray(grid.rows * cols) # Pushed or expanded cells by cell id
     total_nodes = 0 # number of nodes expanded during search
-    traversed = [] # nodes explored when attempting searching algorithm
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
 
     while priority_queue:
         _, _, current = heapq.heappop(priority_queue)
         total_nodes += 1
-        traversed.append((current.x, current.y))  # Add current node to traversed list
-        if (current.x, current.y) == goal:
+        expand((current.x, current.y))  # Add current node to traversed list (or stream it)
+        if (current.x, current.y) in goals:
             return reconstruct_path(current), total_nodes, traversed  # Reconstruct path (with goal nodes), and exlored
-        visited.add((current.x, current.y)) # Add visited node, avoid duplication
-        for dx, dy in [(0, -1), (-1, 0), (0, 1), (1, 0)]:  # Up, Left, Down, Right
-            next_x, next_y = current.x + dx, current.y + dy # attempt moves in Up-Left-Down-Right
-            if (next_x, next_y) not in visited and grid.is_valid(next_x, next_y): # Check valid next cell and visited state
-                # Calculate total cost based on the sum of the path cost and heuristic value (f(n) = g(n) + h(n))
-                total_cost = current.path_cost + heuristic((next_x, next_y), goal) 
-                if heuristic(start, (next_x, next_y)) > heuristic((next_x, next_y), goal): # If g(n) > h(n)
-                    take_cost = heuristic((next_x, next_y), goal) # If f(n) = h(n): Same as GBFS
+        if grid.in_bounds(current.x, current.y):
+            visited[current.x * cols + current.y] = 1 # Add visited node, avoid duplication
+        for next_x, next_y in grid.adjacent(current.x, current.y):  # Up, Left, Down, Right (then the diagonal moves on an 8-connected grid)
+            if not visited[next_x * cols + next_y]: # Check visited state
+                # Calculate total cost based on the sum of the path cost and heuristic value (f(n) = g(n) + h(n)). The path cost kept here
+                # is the terrain penalty (cost above 1 of every cell moved into), so slow zones are avoided while open floor is unchanged
+                h_next = h((next_x, next_y))
+                penalty = current.path_cost + grid.cost(next_x, next_y) - 1
+                total_cost = penalty + h_next
+                if heuristic(start, (next_x, next_y)) > h_next: # If g(n) > h(n)
+                    take_cost = h_next # If f(n) = h(n): Same as GBFS
                 else:
                     take_cost = total_cost # Else, (f(n) = g(n) + h(n)): Same as AS
                 # Push the node to the priority queue with the take_cost, path cost, and node information 
-                heapq.heappush(priority_queue, (take_cost, current.path_cost, Node(next_x, next_y, current)))
-                visited.add((next_x, next_y))            
+                heapq.heappush(priority_queue, (take_cost, current.path_cost, Node(next_x, next_y, current, penalty)))
+                visited[next_x * cols + next_y] = 1
     return [], total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
 
-# Heuristic functions (Manhattan and Euclidean distance)
+# Jump Point Search for the uniform-cost 4-connected grid (JPS4). Canonical paths take vertical (y) moves before horizontal (x) ones,
+# so a horizontal run only has to stop where a vertical move becomes possible right after a blocked one (a forced neighbour), while a
+# vertical run stops wherever a horizontal scan from it finds such a point or the goal. Only these jump points enter the open list.
+# A horizontal scan gives up after JUMP_SCAN_LIMIT cells and the cell it stopped at counts as a jump point (so does the cell of a
+# vertical run whose scan gave up). Without the limit, every cell of a vertical run on open floor scans to the map's edge in both
+# directions, one query costing rows x cols; the extra jump points only add straight segments to the graph, so paths stay optimal.
+JUMP_SCAN_LIMIT = 64
+
+def jump_point_search(grid, start, goal, heuristic, on_expand=None):
+    if not grid.uniform(): # Jumping relies on every move costing 1 along straight moves only: plain A* on other grids
+        return a_star_search(grid, start, goal, heuristic, on_expand=on_expand)
+    total_nodes = 0 # number of jump points expanded during search
+    traversed = [] if on_expand is None else None # jump points explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    if not grid.in_bounds(*start):
+        return [], total_nodes, traversed
+    cells, rows, cols = grid.cells, grid.rows, grid.cols
+    size = rows * cols
+    start_id = grid.index(*start)
+    goals = goal_ids(grid, goal)
+    h_goal = goal_heuristic(heuristic, goal) # h(n) towards the nearest goal
+
+    def jump_x(index, dx): # Run along x from cell id, return the next jump point or -1 when a wall/boundary is hit first
+        step = dx * cols
+        y = index % cols
+        up, down = y > 0, y < cols - 1 # Whether the cells above/below the run exist
+        for _ in range(JUMP_SCAN_LIMIT):
+            index += step
+            if not 0 <= index < size or cells[index]:
+                return -1
+            if index in goals:
+                return index
+            behind = index - step
+            if (up and not cells[index - 1] and cells[behind - 1]) or (down and not cells[index + 1] and cells[behind + 1]):
+                return index # Forced neighbour above or below
+        return index # Scan limit reached: continue from here
+
+    def jump_y(index, dy): # Run along y from cell id, scanning both horizontal directions from every cell passed
+        row_start = index - index % cols
+        left, right = row_start > 0, row_start < size - cols # Whether the cells left/right of the run exist
+        while True:
+            index += dy
+            if not row_start <= index < row_start + cols or cells[index]:
+                return -1
+            if index in goals:
+                return index
+            behind = index - dy
+            if (left and not cells[index - cols] and cells[behind - cols]) or (right and not cells[index + cols] and cells[behind + cols]):
+                return index # Forced neighbour on the left or right
+            if jump_x(index, -1) != -1 or jump_x(index, 1) != -1:
+                return index # A horizontal turn here leads to a jump point (or a scan gave up)
+
+    # Jump points are sparse, so costs and parents are kept in dictionaries rather than arrays sized to the whole map
+    g_score = {start_id: 0}
+    parent = {start_id: start_id}
+    closed = set()
+    h = h_goal(start)
+    priority_queue = [(h, h, start_id, 0)] # (f(n), h(n) as tie-breaker, jump point id, g(n) at push time)
+    while priority_queue:
+        _, _, current, g = heapq.heappop(priority_queue)
+        if g > g_score[current] or current in closed:
+            continue # Stale entry
+        closed.add(current)
+        total_nodes += 1
+        x, y = divmod(current, cols)
+        expand((x, y))  # Add current jump point to traversed list (or stream it)
+        if current in goals:
+            path = [Node(x, y)]
+            while parent[current] != current: # Fill in the straight segments between consecutive jump points
+                px, py = divmod(parent[current], cols)
+                dx, dy = (px > x) - (px < x), (py > y) - (py < y)
+                while (x, y) != (px, py):
+                    x, y = x + dx, y + dy
+                    path.append(Node(x, y))
+                current = parent[current]
+            return path[::-1], total_nodes, traversed
+        if parent[current] == current: # Start cell: all four directions
+            directions = [(0, -1), (-1, 0), (0, 1), (1, 0)]  # Up, Left, Down, Right
+        else: # Prune to the directions a canonical path can continue in
+            px, py = divmod(parent[current], cols)
+            dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+            directions = [(0, -1), (0, 1), (dx, 0)] if dx else [(-1, 0), (1, 0), (0, dy)]
+        for dx, dy in directions:
+            point = jump_x(current, dx) if dx else jump_y(current, dy)
+            if point == -1 or point in closed:
+                continue
+            point_x, point_y = divmod(point, cols)
+            new_g = g + abs(point_x - x) + abs(point_y - y) # Straight segment from current to the jump point
+            if new_g < g_score.get(point, float('inf')):
+                g_score[point] = new_g
+                parent[point] = current
+                h = h_goal((point_x, point_y))
+                heapq.heappush(priority_queue, (new_g + h, h, point, new_g))
+    return [], total_nodes, traversed  # Return an empty path, total jump points explored and traversed if no path is found
+
+# Bidirectional searches run one tree from the start and one from the goal(s) at the same time and join them where they meet
+def bidirectional_path(grid, parents, forward_meet, backward_meet): # Path start..forward_meet (forward tree) followed by backward_meet..goal (backward tree)
+    path = []
+    node = forward_meet
+    while node is not None:
+        path.append(Node(*grid.coords(node)))
+        node = parents[0][node] # back towards the start
+    path.reverse()
+    node = backward_meet
+    while node is not None:
+        path.append(Node(*grid.coords(node)))
+        node = parents[1][node] # on towards the goal
+    return path
+
+# Expands whole BFS layers from whichever side has the smaller frontier. The first layer that touches the other tree holds a shortest
+# path, so the layer is finished and the shortest of all connections found in it is returned.
+def bidirectional_breadth_first_search(grid, start, goal, on_expand=None):
+    total_nodes = 0 # number of nodes expanded during search
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    goals = {cell for cell in goal_ids(grid, goal) if not grid.cells[cell]} # A goal on a wall cannot be reached, so it roots no backward tree
+    if not grid.in_bounds(*start) or not goals:
+        return None, total_nodes, traversed
+    cols = grid.cols
+    start_id = grid.index(*start)
+    if start_id in goals:
+        expand(start)
+        return [Node(*start)], 1, traversed
+    # Both trees are sparse, so parents and depths are dictionaries (forward, backward); the backward tree is rooted at every goal
+    parents = ({start_id: None}, dict.fromkeys(goals))
+    depths = ({start_id: 0}, dict.fromkeys(goals, 0))
+    frontiers = [[start_id], list(goals)]
+    neighbours = grid.neighbours
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1 # Grow the smaller frontier
+        parent, depth = parents[side], depths[side]
+        other_parent, other_depth = parents[1 - side], depths[1 - side]
+        best = None # (path length, cell on this side, cell on the other side)
+        next_frontier = []
+        for current in frontiers[side]:
+            total_nodes += 1
+            expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+            for child in neighbours(current):  # Up, Left, Down, Right
+                if child in other_parent: # The two trees touch
+                    length = depth[current] + 1 + other_depth[child]
+                    if best is None or length < best[0]:
+                        best = (length, current, child)
+                if child not in parent:
+                    parent[child] = current
+                    depth[child] = depth[current] + 1
+                    next_frontier.append(child)
+        if best is not None:
+            _, this_meet, other_meet = best
+            forward_meet, backward_meet = (this_meet, other_meet) if side == 0 else (other_meet, this_meet)
+            return bidirectional_path(grid, parents, forward_meet, backward_meet), total_nodes, traversed
+        frontiers[side] = next_frontier
+    return None, total_nodes, traversed  # Return an empty path and the total number of nodes explored if no path is found
+
+# Bidirectional A*: a forward search towards the nearest goal and a backward search towards the start, each with its own open list.
+# mu is the cheapest start-goal connection seen so far; with consistent heuristics every other path costs at least the smallest f
+# on either open list, so the search stops once mu is no larger than one of them.
+def bidirectional_a_star_search(grid, start, goal, heuristic, on_expand=None):
+    total_nodes = 0 # number of nodes expanded during search
+    traversed = [] if on_expand is None else None # nodes explored when attempting searching algorithm (streamed to on_expand instead when given)
+    expand = traversed.append if on_expand is None else on_expand
+    goals = {cell for cell in goal_ids(grid, goal) if not grid.cells[cell]} # A goal on a wall cannot be reached, so it roots no backward tree
+    if not grid.in_bounds(*start) or not goals:
+        return [], total_nodes, traversed
+    cols = grid.cols
+    start_id = grid.index(*start)
+    if start_id in goals:
+        expand(start)
+        return [Node(*start)], 1, traversed
+    heuristics = (goal_heuristic(heuristic, goal), lambda current: heuristic(current, start)) # (forward, backward)
+    g_scores = ({start_id: 0}, dict.fromkeys(goals, 0))
+    parents = ({start_id: None}, dict.fromkeys(goals))
+    closed = (set(), set())
+    h = heuristics[0](start)
+    open_lists = ([(h, h, start_id, 0)], [])
+    for goal_id in goals:
+        h = heuristics[1](grid.coords(goal_id))
+        open_lists[1].append((h, h, goal_id, 0))
+    heapq.heapify(open_lists[1])
+    mu, meet = float('inf'), None # Best connection cost and the cell where it joins both trees
+    neighbours, step_cost = grid.neighbours, grid.step_cost
+
+    while open_lists[0] and open_lists[1]:
+        if mu <= max(open_lists[0][0][0], open_lists[1][0][0]):
+            break # No unexplored path can beat the best connection
+        side = 0 if len(open_lists[0]) <= len(open_lists[1]) else 1 # Grow the smaller open list
+        g_score, other_g_score = g_scores[side], g_scores[1 - side]
+        _, _, current, g = heapq.heappop(open_lists[side])
+        if g > g_score[current] or current in closed[side]:
+            continue # Stale entry
+        closed[side].add(current)
+        total_nodes += 1
+        expand(divmod(current, cols))  # Add current node to traversed list (or stream it)
+        for child in neighbours(current):  # Up, Left, Down, Right (then diagonals)
+            if child in closed[side]:
+                continue
+            # The backward tree follows moves in reverse: the move it adds runs from child into current
+            child_g = g + (step_cost(current, child) if side == 0 else step_cost(child, current))
+            if child_g < g_score.get(child, float('inf')):
+                g_score[child] = child_g
+                parents[side][child] = current
+                h = heuristics[side](divmod(child, cols))
+                heapq.heappush(open_lists[side], (child_g + h, h, child, child_g))
+            if child in other_g_score and g_score[child] + other_g_score[child] < mu: # Both trees reach this cell
+                mu, meet = g_score[child] + other_g_score[child], child
+    if meet is None:
+        return [], total_nodes, traversed  # Return an empty path, total nodes explored and traversed if no path is found
+    return bidirectional_path(grid, parents, meet, parents[1][meet]), total_nodes, traversed
+
+def path_cost(grid, path): # Total cost of the moves along a path (its length on a 4-connected grid without terrain costs)
+    return sum(grid.step_cost(grid.index(path[i].x, path[i].y), grid.index(path[i+1].x, path[i+1].y)) for i in range(len(path)-1))
+
+# Heuristic functions (Manhattan, Euclidean and octile distance)
 # Change htype value to 2 to set  Euclidean distance as the heuristic function
 def heuristic(current, goal, htype = 1):
     if htype == 1: # Manhattan distance: |x1 - x2|, |y1 - y2|
         return abs(current[0] - goal[0]) + abs(current[1] - goal[1])
     elif htype == 2: # Euclidean distance: sqrt((x2 - x1)^2 + (y2 - y1)^2))
         return ((current[0] - goal[0]) ** 2 + (current[1] - goal[1]) ** 2) ** 0.5
+    elif htype == 3: # Octile distance, exact on an open 8-connected grid: max(dx, dy) - min(dx, dy) straight moves and min(dx, dy) diagonal ones
+        dx, dy = abs(current[0] - goal[0]), abs(current[1] - goal[1])
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+def octile_heuristic(current, goal):
+    return heuristic(current, goal, 3)
+
+def default_heuristic(grid): # Manhattan distance on a 4-connected grid; octile distance on an 8-connected one, where Manhattan overestimates
+    return octile_heuristic if grid.diagonal else heuristic
 
 # Return direction taken from action, execute direction based on current/next node comparision of x/y value
 def get_direction(current, next):
+    if current.x != next.x and current.y != next.y: # Diagonal move: up-left, down-left, down-right or up-right
+        return ('down' if current.y < next.y else 'up') + '-' + ('right' if current.x < next.x else 'left')
     if current.y < next.y:
         return 'down'
     elif current.y > next.y:
@@ -228,77 +1319,186 @@ def get_direction(current, next):
     else:
         return 'stay' # This scenario will not happen!
 
+# Hierarchical search (HPA*, see hpa.py): near-optimal paths from a cluster graph built once per grid and reused until the grid changes
+def hierarchical_search(grid, start, goal, heuristic, on_expand=None):
+    if grid.diagonal and grid.corner_cutting == "always": # Squeezing between two walls can cross a border no entrance covers: plain A*
+        return a_star_search(grid, start, goal, heuristic, on_expand=on_expand)
+    from hpa import abstraction_for
+    return abstraction_for(grid).search(start, goal, heuristic, on_expand)
+
+# Search methods selectable by name: method -> (search function, whether it takes a heuristic)
+SEARCH_METHODS = {
+    "DFS": (depth_first_search, False),
+    "BFS": (breadth_first_search, False),
+    "UCS": (uniform_cost_search, False),
+    "CUS1": (custom_search_1, False),
+    "BiBFS": (bidirectional_breadth_first_search, False),
+    "GBFS": (greedy_best_first_search, True),
+    "AS": (a_star_search, True),
+    "CUS2": (custom_search_2, True),
+    "JPS": (jump_point_search, True),
+    "BiAS": (bidirectional_a_star_search, True),
+    "IDAS": (iterative_deepening_a_star_search, True),
+    "HPA": (hierarchical_search, True),
+    "ARA": (anytime_a_star_search, True),
+    "SMA": (memory_bounded_a_star_search, True),
+}
+
+# Perform search by relevant method, towards all goals at once (the first/nearest reachable goal ends the search), obtain and return path (coordination), total_nodes (number) and traversed (coordination) variables.
+# Informed methods use the given heuristic (by default Manhattan, or octile on an 8-connected grid); on_expand streams expansions instead
+# of returning the traversed list. Other keyword arguments go to the search itself (e.g. ARA*'s time_budget and on_improve)
+def run_search(grid, start, goal, method, heuristic=None, on_expand=None, **options):
+    if method not in SEARCH_METHODS:
+        uninformed = ", ".join(name for name, (_, informed) in SEARCH_METHODS.items() if not informed)
+        informed = ", ".join(name for name, (_, informed) in SEARCH_METHODS.items() if informed)
+        raise ValueError(f"Invalid search method. Please choose among: {uninformed} (uninformed) and {informed} (informed)")
+    search, informed = SEARCH_METHODS[method]
+    if not grid.reachable(start, goal): # Every goal is walled off from the start: no need to search
+        return None, 0, [] if on_expand is None else None
+    if informed:
+        return search(grid, start, goal, default_heuristic(grid) if heuristic is None else heuristic, on_expand=on_expand, **options)
+    return search(grid, start, goal, on_expand=on_expand, **options)
+
+# Read map configuration from file: returns the grid (with walls and terrain costs), the start cell and the list of goal(s).
+# profile (a profiling.Profile) times the parse, grid and walls phases when given.
+def load_map(filename, profile=None):
+    phase = profile.phase if profile is not None else lambda name: nullcontext()
+    with phase("parse"):
+        with open(filename, 'rb') as file:
+            binary = file.read(4) == b"BMAP" # Binary map format, see mapfile.py
+        if binary:
+            from mapfile import load_binary_map
+            return load_binary_map(filename)
+        rows, cols, start, goal, walls, terrain, moves = parse_map(filename)
+
+    # Initialize the grid
+    with phase("grid"):
+        grid = Grid(rows, cols)
+        grid.set_moves(*moves)
+    with phase("walls"):
+        grid.add_walls(walls) # Add wall(s)
+        for area in terrain:
+            grid.add_cost(*area) # Add slow zone(s)
+    return grid, start, goal
+
+# Text map format: returns its dimensions, start, goal(s), wall and cost rectangles, and neighbourhood
+def parse_map(filename):
+    with open(filename, 'r') as file:
+        lines = [line.strip() for line in file.readlines()]
+    # Read map's dimensions
+    dimension_match = re.match(r'\[(\d+),\s*(\d+)\]', lines[0]) # Looking for a string: starts with '[' followed by one or more digits '\d+' followed by a comma ',' followed by whitespace '\s*' followed by one or more digits '\d+' and ends with ']'. Read from first line.
+    cols, rows = map(int, (dimension_match.group(1), dimension_match.group(2))) # Construct map's dimension
+    # Match's start coordinates
+    start_match = re.match(r'\((\d+),\s*(\d+)\)', lines[1]) # Looking for a string: starts with '(' followed by one or more digits '\d+' followed by a comma ',' followed by whitespace '\s*' followed by one or more digits '\d+' and ends with ')'. Read from second line.
+    start = (int(start_match.group(1)), int(start_match.group(2))) # Append map's starting point
+    # Extract goal coordinates
+    goal_coords = re.findall(r'\((\d+),\s*(\d+)\)', lines[2]) # Looking for one or more strings: starts with '(' followed by one or more digits '\d+' followed by a comma ',' followed by whitespace '\s*' followed by one or more digits '\d+' and ends with ')'. Read from third line.
+    goal = [] # List of goal(s)
+    for x_str, y_str in goal_coords:
+        try:
+            x, y = map(int, (x_str, y_str))
+            goal.append((x, y)) # Append goal coordinate
+        except ValueError: # Message format error for map file's coordination configuaration
+            print(f"Invalid coordinate format: ({x_str}, {y_str}).")
+    if not goal:
+        raise ValueError("No valid goal node found.") # For no goal node defined
+
+    # Initialize the wall
+    walls = []
+    terrain = [] # Cost rectangles (x, y, w, h, cost): moving into any of their cells costs cost instead of 1
+    moves = (4, "never") # Neighbourhood, e.g. a "moves 8" or "moves 8 no-squeeze" line for diagonal moves (see Grid.set_moves())
+    for wall in lines[3:]: # Read from the forth line til the end.
+        moves_match = re.match(r'moves\s+(\d+)(?:\s+(\S+))?$', wall)
+        if moves_match:
+            moves = (int(moves_match.group(1)), moves_match.group(2) or "never")
+            continue
+        wall_coords = re.findall(r'\d+', wall)
+        if len(wall_coords) == 4:  # Ensure correct wall's coordinates as template
+            walls.append(tuple(map(int, wall_coords))) # Append wall coordinat(s)
+        elif len(wall_coords) == 5:
+            terrain.append(tuple(map(int, wall_coords)))
+    return rows, cols, start, goal, walls, terrain, moves
+
 if __name__ == "__main__":
     filename = sys.argv[1]
     method = sys.argv[2]
+    # Per-phase timings and search-loop counters, enabled by --profile [FILE] or the SEARCH_PROFILE environment variable (see profiling.py)
+    from profiling import Profile, instrument, profile_requested
+    profiled, profile_destination = profile_requested(sys.argv)
+    profile = Profile() if profiled else None
+    phase = profile.phase if profiled else lambda name: nullcontext()
 
-    # Read map configuration from file
-    with open(filename, 'r') as file:
-        lines = [line.strip() for line in file.readlines()]
-        # Read map's dimensions
-        dimension_match = re.match(r'\[(\d+),\s*(\d+)\]', lines[0]) # Looking for a string: starts with '[' followed by one or more digits '\d+' followed by a comma ',' followed by whitespace '\s*' followed by one or more digits '\d+' and ends with ']'. Read from first line.
-        cols, rows = map(int, (dimension_match.group(1), dimension_match.group(2))) # Construct map's dimension
-        # Match's start coordinates
-        start_match = re.match(r'\((\d+),\s*(\d+)\)', lines[1]) # Looking for a string: starts with '(' followed by one or more digits '\d+' followed by a comma ',' followed by whitespace '\s*' followed by one or more digits '\d+' and ends with ')'. Read from second line.
-        start = (int(start_match.group(1)), int(start_match.group(2))) # Append map's starting point
-        # Extract goal coordinates
-        goal_coords = re.findall(r'\((\d+),\s*(\d+)\)', lines[2]) # Looking for one or more strings: starts with '(' followed by one or more digits '\d+' followed by a comma ',' followed by whitespace '\s*' followed by one or more digits '\d+' and ends with ')'. Read from third line.
-        goal = [] # List of goal(s)
-        for x_str, y_str in goal_coords:
-            try:
-                x, y = map(int, (x_str, y_str))
-                goal.append((x, y)) # Append goal coordinate
-            except ValueError: # Message format error for map file's coordination configuaration
-                print(f"Invalid coordinate format: ({x_str}, {y_str}).")
-        if not goal:
-            print("No valid goal node found.") # For no goal node defined
-            sys.exit(1)
-
-        # Initialize the wall
-        walls = []
-        for wall in lines[3:]: # Read from the forth line til the end.
-            wall_coords = re.findall(r'\d+', wall)
-            if len(wall_coords) == 4:  # Ensure correct wall's coordinates as template
-                walls.append(tuple(map(int, wall_coords))) # Append wall coordinat(s)
-
-        # Initialize the grid
-        grid = Grid(rows, cols)
-        for wall in walls:
-            grid.add_wall(*wall) # Add wall(s)
-
-        # Perform search by relevant method, obtain and return path (coordination), total_nodes (number) and traversed (coordination) variables.
-        if method == "DFS":
-            path, total_nodes, traversed = depth_first_search(grid, start, goal[0])
-        elif method == "BFS":
-            path, total_nodes, traversed = breadth_first_search(grid, start, goal[0])
-        elif method == "CUS1":
-            path, total_nodes, traversed = custom_search_1(grid, start, goal[0])
-        elif method == "GBFS":
-            path, total_nodes, traversed = greedy_best_first_search(grid, start, goal[0], heuristic)
-        elif method == "AS":
-            path, total_nodes, traversed = a_star_search(grid, start, goal[0], heuristic)
-        elif method == "CUS2":
-            path, total_nodes, traversed = custom_search_2(grid, start, goal[0], heuristic)
-
-        else: 
-            print("Invalid search method. Please choose among: DFS, BFS, CUS1 (uninformed) and GBFS, AS, CUS2 (informed)") # Invalid search method command
-            sys.exit(1)
-
-        # Print result (including the total nodes and path) for either valid and invalid path
-        if path:
-            print(f"{filename} {method}")
-            print(f"< Node ({goal[0][0]}, {goal[0][1]})> {total_nodes}") # add {len(path)} component for printing path's length
-            print([get_direction(path[i], path[i+1]) for i in range(len(path)-1)]) # get direction for path i to i+1 that not include the coordination of starting point.
+    try:
+        grid, start, goal = load_map(filename, profile)
+        if "--moves" in sys.argv: # Override the map's neighbourhood: --moves 4|8 [--corners never|no-squeeze|always]
+            corners = sys.argv[sys.argv.index("--corners") + 1] if "--corners" in sys.argv else "never"
+            grid.set_moves(int(sys.argv[sys.argv.index("--moves") + 1]), corners)
+        search_heuristic = None # Default heuristic for the grid's neighbourhood
+        if "--alt" in sys.argv: # Landmark (ALT) heuristic with K landmarks, tables cached next to the map file
+            from landmarks import load_or_build_landmarks
+            search_heuristic = load_or_build_landmarks(grid, filename, int(sys.argv[sys.argv.index("--alt") + 1]))
+        if method == "HPA": # Cluster graph cached next to the map file; --clusters N sets the cluster size (default 16)
+            from hpa import load_or_build_abstraction, DEFAULT_CLUSTER_SIZE
+            cluster_size = int(sys.argv[sys.argv.index("--clusters") + 1]) if "--clusters" in sys.argv else DEFAULT_CLUSTER_SIZE
+            load_or_build_abstraction(grid, filename, cluster_size)
+        options = {}
+        bounds = [] # Suboptimality bound of each path ARA* found
+        if method == "ARA": # --time-budget-ms N stops refining after N ms; without it ARA* runs down to an optimal path
+            options["on_improve"] = lambda path, bound: bounds.append(bound)
+            if "--time-budget-ms" in sys.argv:
+                options["time_budget"] = float(sys.argv[sys.argv.index("--time-budget-ms") + 1]) / 1000
+        if method == "SMA" and "--node-budget" in sys.argv: # Most search nodes SMA* may keep in memory (default DEFAULT_NODE_BUDGET)
+            options["node_budget"] = int(sys.argv[sys.argv.index("--node-budget") + 1])
+        trace_file = None
+        on_expand = None
+        if "--trace" in sys.argv: # Stream expansions to a file instead of keeping them in memory (no GUI replay then)
+            trace_file = open(sys.argv[sys.argv.index("--trace") + 1], 'w')
+            on_expand = ExpansionWriter(trace_file)
+        cache = None
+        if "--cache" in sys.argv and on_expand is not None: # A cached answer has no expansions to trace
+            print("--trace needs the search to run: --cache is ignored", file=sys.stderr)
+        elif "--cache" in sys.argv: # Answer from (and add to) a SQLite file of earlier results on this map (see cache.py); no GUI replay then
+            from cache import ResultCache
+            # This module's run_search: run as a script, searchmain is __main__, which is what instrument() patches for --profile
+            cache = ResultCache(path=sys.argv[sys.argv.index("--cache") + 1], search=run_search)
+        try:
+            with instrument(profile, sys.modules[__name__], grid) if profiled else nullcontext(), phase("search"):
+                if cache is None:
+                    path, total_nodes, traversed = run_search(grid, start, goal, method, search_heuristic, on_expand, **options)
+                else:
+                    path, total_nodes, traversed = cache.search(grid, start, goal, method, search_heuristic, **options)
+        finally:
+            if trace_file is not None:
+                trace_file.close()
+            if cache is not None:
+                cache.close()
+    except ValueError as error: # No goal in the map file or invalid search method command
+        print(error)
+        sys.exit(1)
+
+    # Print result (including the total nodes and path) for either valid and invalid path
+    if path:
+        print(f"{filename} {method}")
+        print(f"< Node ({path[-1].x}, {path[-1].y})> {total_nodes}") # add {len(path)} component for printing path's length
+        with phase("directions"):
+            directions = [get_direction(path[i], path[i+1]) for i in range(len(path)-1)] # get direction for path i to i+1 that not include the coordination of starting point.
+        print(directions)
+        if bounds:
+            print(f"Suboptimality bound: {bounds[-1]:.3f} ({len(bounds)} path(s) found)")
+    else:
+        print(f"{filename} {method}")
+        if "time_budget" in options and grid.is_valid(*start) and grid.reachable(start, goal): # ARA* ran out of time, not of paths
+            print(f"No path found within the time budget; {total_nodes}")
         else:
-            print(f"{filename} {method}")
             print(f"No goal is reachable; {total_nodes}") # return total_nodes explored although no path found
-
-    # Create an instance containing only rows and column for Grid class, used to scale the GUI display window
-    grid_instance = Grid(rows, cols) 
+    if profiled:
+        profile.count("expansions", total_nodes)
+        profile.report(profile_destination)
 
     # Create GUI window if path is not None
     # Send varibale such as dimension, start, goal, set of walls, path, traversed.
-    if path:
+    # The loaded grid doubles as the dimension instance used to scale the GUI display window (no second buffer is allocated)
+    if path and traversed is not None:
         from gui import GUI
-        app = GUI(grid_instance, grid, start, goal[0], [tuple((node.x, node.y)) for node in path], traversed)
-        app.mainloop()
\ No newline at end of file
+        app = GUI(grid, grid, start, goal, [tuple((node.x, node.y)) for node in path], traversed)
+        app.mainloop()
@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import subprocess
+import multiprocessing
+
+import searchmain
+from searchmain import SEARCH_METHODS, ExpansionCounter, Grid, run_search, path_cost
+from benchmark import open_field, peak_rss_kib
+
+# Benchmark suite over generated maps. Every map is rebuilt from its (kind, size, seed), so two runs, e.g. on two commits, search
+# exactly the same maps. Each (map, method) job runs in a fresh process that generates the map, runs the search once and reports its
+# time, expansions, path length and cost, and peak resident memory. The report is JSON (one row per job, in a fixed order) and
+# "python suite.py --diff old.json new.json" lists what changed between two reports.
+#
+# Map kinds (start at the top-left corner, goal at the far corner, or in the centre for spirals):
+#   open    empty floor
+#   rects   random rectangular walls (benchmark.open_field)
+#   maze    perfect maze from a randomised depth-first backtracker, the algorithm of pymaze's maze.CreateMaze. Cells are at odd
+#           coordinates with walls between them. CreateMaze itself draws a Tk window and keeps its cells in lists, so it is
+#           impractical beyond a few hundred cells; this generator carves straight into the Grid
+#   spiral  nested rectangular rings, each with one gap on alternate sides, so the only way to the centre winds through every ring
+
+MAP_KINDS = ["open", "rects", "maze", "spiral"]
+DEFAULT_SIZES = [10, 50, 100, 200]
+DEFAULT_TIMEOUT = 60 # Seconds per job: CUS1 and IDAS need far longer than that on the larger spirals and mazes
+FIELDS = ["map", "size", "seed", "method", "path_length", "path_cost", "total_nodes", "seconds", "map_rss_kib", "peak_rss_kib", "error"]
+
+def open_map(size, seed):
+    return Grid(size, size), (0, 0), (size - 1, size - 1)
+
+def rects_map(size, seed):
+    return open_field(searchmain, size, seed)
+
+def maze_map(size, seed):
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    grid.add_wall(0, 0, size, size)
+    cells = grid.cells
+    cols = grid.cols
+    count = (size - 1) // 2 # Maze cells per side; maze cell (i, j) is grid cell (2i + 1, 2j + 1)
+    cells[cols + 1] = 0
+    stack = [(0, 0)]
+    carved = bytearray(count * count)
+    carved[0] = 1
+    while stack:
+        i, j = stack[-1]
+        options = [(i + di, j + dj) for di, dj in ((-1, 0), (0, -1), (1, 0), (0, 1))
+                   if 0 <= i + di < count and 0 <= j + dj < count and not carved[(i + di) * count + j + dj]]
+        if not options:
+            stack.pop() # Dead end: backtrack
+            continue
+        next_i, next_j = rng.choice(options)
+        carved[next_i * count + next_j] = 1
+        cells[(i + next_i + 1) * cols + j + next_j + 1] = 0 # Wall between the two cells
+        cells[(2 * next_i + 1) * cols + 2 * next_j + 1] = 0
+        stack.append((next_i, next_j))
+    grid._changed() # Carved through the buffer directly: drop what was cached for the all-wall grid
+    return grid, (1, 1), (2 * count - 1, 2 * count - 1)
+
+def spiral_map(size, seed):
+    grid = Grid(size, size)
+    last = size - 1
+    ring = 0
+    for offset in range(1, size, 2): # Ring from (offset, offset) to (last - offset, last - offset), with an empty corridor between rings
+        far = last - offset
+        if far - offset < 2:
+            break # No room left inside the ring
+        grid.add_wall(offset, offset, far - offset + 1, 1)
+        grid.add_wall(offset, far, far - offset + 1, 1)
+        grid.add_wall(offset, offset, 1, far - offset + 1)
+        grid.add_wall(far, offset, 1, far - offset + 1)
+        if ring % 2: # Gap next to the near corner on the far side, then next to the far corner on the near side
+            grid.remove_wall(far, offset + 1, 1, 1)
+        else:
+            grid.remove_wall(offset, far - 1, 1, 1)
+        ring += 1
+    return grid, (0, 0), (size // 2, size // 2)
+
+GENERATORS = {"open": open_map, "rects": rects_map, "maze": maze_map, "spiral": spiral_map}
+
+def run_job(kind, size, seed, method, connection): # Executed in a fresh process; sends back the result row
+    row = dict.fromkeys(FIELDS) | {"map": kind, "size": size, "seed": seed, "method": method}
+    try:
+        grid, start, goal = GENERATORS[kind](size, seed)
+        row["map_rss_kib"] = peak_rss_kib() # Memory taken by the interpreter and the map alone
+        began = time.perf_counter()
+        path, total_nodes, _ = run_search(grid, start, goal, method, on_expand=ExpansionCounter()) # No traversed list: RSS is the search's own
+        row["seconds"] = round(time.perf_counter() - began, 6)
+        row["peak_rss_kib"] = peak_rss_kib()
+        row["total_nodes"] = total_nodes
+        row["path_length"] = len(path) - 1 if path else None
+        row["path_cost"] = path_cost(grid, path) if path else None
+    except Exception as error: # Reported in the row instead of aborting the suite
+        row["error"] = repr(error)
+    connection.send(row)
+    connection.close()
+
+def run_suite(kinds=MAP_KINDS, sizes=DEFAULT_SIZES, methods=list(SEARCH_METHODS), seed=0, timeout=DEFAULT_TIMEOUT, progress=None):
+    # Jobs run one at a time so they do not compete for the CPU; a job still running after timeout seconds (None: no limit) is stopped
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for kind in kinds:
+        for size in sizes:
+            for method in methods:
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=run_job, args=(kind, size, seed, method, sender))
+                process.start()
+                sender.close()
+                failed = dict.fromkeys(FIELDS) | {"map": kind, "size": size, "seed": seed, "method": method}
+                if receiver.poll(timeout):
+                    try:
+                        row = receiver.recv()
+                    except EOFError: # The process died without replying, e.g. killed when out of memory
+                        process.join()
+                        row = failed | {"error": f"Job crashed with exit code {process.exitcode}"}
+                else:
+                    process.terminate()
+                    row = failed | {"error": f"Timed out after {timeout} s"}
+                process.join()
+                receiver.close()
+                rows.append(row)
+                if progress:
+                    progress(row)
+    return rows
+
+def current_commit(): # Commit the suite ran on, recorded in the report
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_report(rows, output, seed):
+    report = {"commit": current_commit(), "python": platform.python_version(), "machine": platform.machine(), "seed": seed, "rows": rows}
+    with open(output, "w") as file:
+        json.dump(report, file, indent=1)
+
+def diff_reports(old_path, new_path, threshold=0.1): # One line per job in both reports whose results changed or time moved by more than threshold
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    print(f"{old_path} ({old['commit']}) -> {new_path} ({new['commit']})")
+    old_rows = {(row["map"], row["size"], row["seed"], row["method"]): row for row in old["rows"]}
+    for row in new["rows"]:
+        key = (row["map"], row["size"], row["seed"], row["method"])
+        before = old_rows.get(key)
+        if before is None:
+            continue
+        changes = [f"{field} {before[field]} -> {row[field]}" for field in ("path_length", "path_cost", "total_nodes", "error")
+                   if before[field] != row[field]]
+        ratio = row["seconds"] / before["seconds"] if before["seconds"] and row["seconds"] else 1
+        if not changes and abs(ratio - 1) <= threshold:
+            continue
+        changes.append(f"time x{ratio:.2f}")
+        if before["peak_rss_kib"] and row["peak_rss_kib"]:
+            changes.append(f"rss {row['peak_rss_kib'] - before['peak_rss_kib']:+d} KiB")
+        print(f"{key[0]:<7} {key[1]:>5} {key[3]:<5} " + ", ".join(changes))
+
+def print_row(row):
+    result = row["error"] or f"path {row['path_length']} cost {row['path_cost']} nodes {row['total_nodes']} {row['seconds']:.3f} s rss {row['peak_rss_kib']} KiB"
+    print(f"{row['map']:<7} {row['size']:>5} {row['method']:<5} {result}", file=sys.stderr)
+
+# Usage: python suite.py [--maps open,rects,maze,spiral] [--methods DFS,BFS,...] [--seed N] [--timeout SECONDS] [--output report.json]
+#                        [size ...]
+#        python suite.py --diff old.json new.json
+# Sizes default to 10 50 100 200; each map is size x size (e.g. 5000 for 5000x5000). Jobs are stopped after --timeout seconds
+# (default 60, 0 for no limit) and reported as timed out.
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--diff" in args:
+        position = args.index("--diff")
+        diff_reports(args[position + 1], args[position + 2])
+        sys.exit(0)
+    options = {"--maps": ",".join(MAP_KINDS), "--methods": ",".join(SEARCH_METHODS), "--seed": "0", "--timeout": str(DEFAULT_TIMEOUT),
+               "--output": "suite.json"}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+    kinds, methods = options["--maps"].split(","), options["--methods"].split(",")
+    unknown = [name for name in kinds if name not in GENERATORS] + [name for name in methods if name not in SEARCH_METHODS]
+    if unknown:
+        print(f"Unknown map kind(s) or method(s): {', '.join(unknown)}")
+        sys.exit(1)
+    sizes = [int(arg) for arg in args] or DEFAULT_SIZES
+    seed = int(options["--seed"])
+    timeout = float(options["--timeout"]) or None
+    rows = run_suite(kinds, sizes, methods, seed, timeout, print_row)
+    write_report(rows, options["--output"], seed)